@@ -1,10 +1,14 @@
 import random
 
+from engine.rng import derive_rng, stream_seed
+
 class AIBehavior:
     """Defines AI company behavior based on personality type (aggressive, balanced, conservative, premium, volume)."""
-    def __init__(self, name, personality):
+    def __init__(self, name, personality, rng=None):
         self.name = name
         self.personality = personality
+        # Random stream (shared by the AIs of a cohort, see AICohort)
+        self.rng = rng if rng is not None else random.Random()
         
         if personality == "aggressive":
             self.expand_rate = 0.85
@@ -34,30 +38,31 @@ class AIBehavior:
     
     def should_buy_factory(self, turn):
         """Turn 1 mandatory, then probabilistic based on expand_rate."""
-        return turn == 1 or random.random() < self.expand_rate
+        return turn == 1 or self.rng.random() < self.expand_rate
     
     def choose_country_for_factory(self):
         """Randomly selects a preferred country for factory expansion."""
-        return random.choice(self.preferred_countries)
+        return self.rng.choice(self.preferred_countries)
     
-    def allocate_lines_by_country(self, factories_owned):
-        """Allocates production lines per factory and product."""
+    def line_allocation(self):
+        """Lines per product wanted in each country where the AI owns factories."""
         allocation = {}
         capacity_per_factory = 20
+        remaining = capacity_per_factory
         
-        for country in factories_owned.keys():
-            allocation[country] = {}
-            remaining = capacity_per_factory
-            
-            for product in ["A", "B", "C"]:
-                qty = int(capacity_per_factory * self.product_focus.get(product, 0))
-                qty = min(qty, remaining)
-                if qty > 0:
-                    allocation[country][product] = qty
-                    remaining -= qty
+        for product in ["A", "B", "C"]:
+            qty = int(capacity_per_factory * self.product_focus.get(product, 0))
+            qty = min(qty, remaining)
+            if qty > 0:
+                allocation[product] = qty
+                remaining -= qty
         
         return allocation
     
+    def allocate_lines_by_country(self, factories_owned):
+        """Allocates production lines per factory and product."""
+        return {country: self.line_allocation() for country in factories_owned.keys()}
+    
     def choose_price(self, available_prices):
         """Chooses a price from available market options based on personality."""
         sorted_prices = sorted(available_prices)
@@ -77,48 +82,115 @@ class AIBehavior:
     def choose_sales_country(self, product):
         """Chooses the country to sell this product in."""
         if product == "C":
-            return random.choice(["USA", "France"])
+            return self.rng.choice(["USA", "France"])
         elif product == "A":
-            return random.choice(self.preferred_countries)
+            return self.rng.choice(self.preferred_countries)
         else:
-            return random.choice(self.preferred_countries)
+            return self.rng.choice(self.preferred_countries)
+
+
+class AICohort:
+    """AIs sharing one personality. Decisions are made for all members at once:
+    shared choices (line allocation, prices) are computed once, random ones are
+    drawn in one batch from the cohort's stream.
+    """
+    def __init__(self, personality, seed=None):
+        self.personality = personality
+        self.seed = seed
+        self.names = []
+        self.behavior = AIBehavior(personality, personality, rng=derive_rng(seed, "cohort", personality))
+        self.rng = self.behavior.rng
+    
+    def start_turn(self, turn):
+        """Reseeds the cohort stream: draws only depend on (seed, personality, turn)."""
+        self.rng.seed(stream_seed(self.seed, "cohort", self.personality, turn))
+    
+    def factory_purchases(self, turn):
+        """Country of the factory each member tries to buy this turn (None for no purchase)."""
+        rng = self.rng
+        behavior = self.behavior
+        countries = behavior.preferred_countries
+        if turn == 1:
+            return [rng.choice(countries) for _ in self.names]
+        rate = behavior.expand_rate
+        return [rng.choice(countries) if rng.random() < rate else None for _ in self.names]
+    
+    def prices(self, products_meta):
+        """Price chosen by every member, per product."""
+        return {product: self.behavior.choose_price(meta["price_options"])
+                for product, meta in products_meta.items()}
+    
+    def sales_countries(self, product):
+        """Target country of each member for a product."""
+        rng = self.rng
+        countries = ["USA", "France"] if product == "C" else self.behavior.preferred_countries
+        return [rng.choice(countries) for _ in self.names]
 
 
 class AIManager:
-    """Manages all AI companies in the simulation."""
+    """Manages all AI companies in the simulation, grouped in personality cohorts."""
     PERSONALITIES = ["aggressive", "balanced", "conservative", "premium", "volume"]
+    BASE_NAMES = [
+        "AI_Alpha", "AI_Beta", "AI_Gamma", "AI_Delta", "AI_Epsilon",
+        "AI_Zeta", "AI_Eta", "AI_Theta", "AI_Iota", "AI_Kappa"
+    ]
     
-    def __init__(self, num_ais=5):
-        # 10 max, no negative values
-        self.num_ais = max(0, min(int(num_ais), 10))
-        self.ais = self._generate_ais()
+    def __init__(self, num_ais=5, seed=None, cohorts=None):
+        """cohorts: optional {personality: count}; overrides num_ais and the default mix."""
+        if cohorts:
+            for personality in cohorts:
+                if personality not in self.PERSONALITIES:
+                    raise ValueError(f"Unknown personality: {personality}")
+            num_ais = sum(cohorts.values())
+        # No negative values
+        self.num_ais = max(0, int(num_ais))
+        self.seed = seed
+        self.rng = derive_rng(seed, "ai_manager")
+        self.cohorts = {p: AICohort(p, seed) for p in self.PERSONALITIES}
+        self.ais = self._generate_ais(cohorts)
+    
+    @classmethod
+    def _name(cls, i):
+        """AI_Alpha..AI_Kappa, then AI_Alpha_2..AI_Kappa_2, and so on."""
+        base = cls.BASE_NAMES[i % len(cls.BASE_NAMES)]
+        return base if i < len(cls.BASE_NAMES) else f"{base}_{i // len(cls.BASE_NAMES) + 1}"
+
+    @classmethod
+    def is_ai_name(cls, name, num_ais):
+        """True if one of num_ais AIs would be called name (companies are identified by name)."""
+        return any(cls._name(i) == name for i in range(max(0, int(num_ais))))
     
-    def _generate_ais(self):
-        """Generates up to 10 AI companies.
-        - 0..4: fixed names + cycled personalities
-        - 5..9: fixed names + random personalities
+    def _generate_ais(self, cohorts=None):
+        """Generates AI companies.
+        - with cohorts: members of each personality in PERSONALITIES order
+        - otherwise 0..4: cycled personalities, 5+: random personalities
         """
-        import random
-        ais = {}
-        base_names = [
-            "AI_Alpha", "AI_Beta", "AI_Gamma", "AI_Delta", "AI_Epsilon",
-            "AI_Zeta", "AI_Eta", "AI_Theta", "AI_Iota", "AI_Kappa"
-        ]
+        if cohorts:
+            personalities = [p for p in self.PERSONALITIES for _ in range(cohorts.get(p, 0))]
+        else:
+            personalities = [
+                self.PERSONALITIES[i % len(self.PERSONALITIES)] if i < 5 else self.rng.choice(self.PERSONALITIES)
+                for i in range(self.num_ais)
+            ]
         
-        for i in range(self.num_ais):
-            name = base_names[i]
-            if i < 5:
-                personality = self.PERSONALITIES[i % len(self.PERSONALITIES)]
-            else:
-                personality = random.choice(self.PERSONALITIES)
-            ais[name] = AIBehavior(name, personality)
+        ais = {}
+        for i, personality in enumerate(personalities):
+            name = self._name(i)
+            cohort = self.cohorts[personality]
+            cohort.names.append(name)
+            ais[name] = AIBehavior(name, personality, rng=cohort.rng)
         
         return ais
     
+    def start_turn(self, turn):
+        """Gives every cohort a fresh random stream for the turn, so no RNG state has to be saved."""
+        for cohort in self.cohorts.values():
+            cohort.start_turn(turn)
+    
     def get_ai(self, name):
         """Retrieves an AI by name."""
         return self.ais.get(name)
     
     def get_all_ais(self):
         """Returns list of all AI behavior objects."""
-        return list(self.ais.values())
\ No newline at end of file
+        return list(self.ais.values())
@@ -0,0 +1,95 @@
+import base64
+import json
+import os
+
+# Player actions that can be recorded and replayed
+ACTIONS = ["buy_factory", "modify_lines", "modify_lines_batch", "update_sales", "end_turn"]
+
+
+class ActionLog:
+    """Append-only log of player actions. With the game config (which holds the seed)
+    it is enough to rebuild the game at any turn without snapshots.
+    """
+    def __init__(self, config, path=None, base=None):
+        self.config = config
+        self.entries = []
+        # Snapshot (engine/snapshot.py) the actions apply to; None means a new game
+        self.base = base
+        # Optional JSON Lines file: first line is the header, then one line per action
+        self.path = path
+        if path and (not os.path.exists(path) or os.path.getsize(path) == 0):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self._header()) + "\n")
+
+    def _header(self):
+        header = {"config": self.config}
+        if self.base is not None:
+            header["base"] = base64.b64encode(self.base).decode("ascii")
+        return header
+
+    def append(self, turn, action, args):
+        """Records an action taken during a turn."""
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action: {action}")
+        entry = {"turn": turn, "action": action, "args": args}
+        self.entries.append(entry)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, path):
+        """Writes the whole log to a JSON Lines file (readable with load)."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(json.dumps(self._header()) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry) + "\n")
+
+    @classmethod
+    def load(cls, path):
+        """Reads a log written with a path. A truncated last line (crash) is ignored."""
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            header = json.loads(f.readline())
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return cls.from_header(header, entries)
+
+    @classmethod
+    def from_header(cls, header, entries=()):
+        """Builds a log (without file) from a header (see _header) and entries."""
+        log = cls.__new__(cls)
+        log.path = None
+        log.config = header["config"]
+        log.base = base64.b64decode(header["base"]) if "base" in header else None
+        log.entries = list(entries)
+        return log
+
+
+def replay(log, until_turn=None):
+    """Rebuilds a World from its action log.
+    With until_turn, stops at the start of that turn (before any of its actions).
+    """
+    from engine.world import World
+    from engine import snapshot
+
+    if log.base is not None:
+        world = snapshot.load(log.base)
+        if until_turn is not None and until_turn < world.turn:
+            raise ValueError(f"Log starts at turn {world.turn}, cannot replay to turn {until_turn}")
+    else:
+        world = World(verbose=False, **log.config)
+    for entry in log:
+        if until_turn is not None and world.turn >= until_turn:
+            break
+        # Only applied actions are logged: one failing here means the log does not match the game
+        world.apply_action(entry["action"], entry["args"])
+    return world
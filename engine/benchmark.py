@@ -0,0 +1,312 @@
+"""Engine benchmarks with scaling sweeps and regression checks.
+
+Usage:
+    python -m engine.benchmark run --output bench.json          # full sweep
+    python -m engine.benchmark run --quick --output bench.json  # small sweep
+    python -m engine.benchmark compare benchmarks/baseline.json bench1.json bench2.json bench3.json
+    python -m engine.benchmark baseline bench1.json bench2.json bench3.json --output benchmarks/baseline.json
+
+Results are JSON: one entry per (benchmark, parameters) with the best and median time
+of several repetitions. compare exits with status 1 when a benchmark's median got slower
+than the baseline's by more than the threshold (and by more than floor_ms) in every run
+given, so that a slowdown only seen in one noisy run is not reported.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from engine.market_generator import MarketGenerator
+from engine.world import World
+from entities.company import Inventory
+from entities.factory import COUNTRY_CONFIG
+
+COUNTRIES = list(COUNTRY_CONFIG.keys())
+PRODUCTS = ["A", "B", "C"]
+
+# Parameter sweeps (quick sweeps for a fast sanity run)
+SWEEPS = {
+    "full": {
+        "num_ais": [10, 100, 1000],
+        "factories": [1, 10, 100],
+        "demand_scale": [1, 10, 100],
+        "turns": [10, 50],
+        "backend": ["python", "numpy"],
+    },
+    "quick": {
+        "num_ais": [10, 100],
+        "factories": [1, 10],
+        "demand_scale": [1, 10],
+        "turns": [10],
+        "backend": ["python", "numpy"],
+    },
+}
+
+
+def make_world(num_ais=10, factories=1, demand_scale=1, seed=0, backend="python"):
+    """Builds a synthetic mid-game world: every company owns `factories` factories
+    spread over the countries, with full lines, stock and sales decisions.
+    Demand of every market is multiplied by demand_scale.
+    """
+    world = World(total_turns=50, num_ais=num_ais, verbose=False, seed=seed, backend=backend)
+    for product in world.parameters.generator.base_config["products"].values():
+        product["base_demand"] = {c: d * demand_scale for c, d in product["base_demand"].items()}
+
+    turn_data = world.get_turn_data()
+    for i, company in enumerate(world.companies):
+        company.cash = 10_000_000
+        for f in range(factories):
+            factory = company.add_factory(COUNTRIES[(i + f) % len(COUNTRIES)])
+            for j, product in enumerate(PRODUCTS):
+                factory.modify_lines(product, [10, 6, 4][j])
+        for j, product in enumerate(PRODUCTS):
+            prices = turn_data["products_meta"][product]["price_options"]
+            company.set_decision(product, "country", COUNTRIES[(i + j) % len(COUNTRIES)])
+            company.set_decision(product, "price", prices[(i * 7 + j) % len(prices)])
+    return world
+
+
+def _restock(world):
+    for i, company in enumerate(world.companies):
+        # Stock made in the company's first factory country
+        origin = next(iter(company.factories), "France")
+        company.inventory = Inventory()
+        for product, qty in (("A", 5000 + i % 7 * 100), ("B", 800 + i % 5 * 50), ("C", 300 + i % 3 * 20)):
+            company.inventory.add(origin, product, qty)
+    if world.backend == "numpy":
+        # The numpy backend keeps stock in arrays across turns: load the new stock into them
+        world._stock_table = world._vector_engine.StockTable(world.companies)
+
+
+def measure(run, setup=None, repeat=5, min_time=0.05):
+    """Best and median seconds of run() over `repeat` rounds (each round loops until min_time)."""
+    timings = []
+    for _ in range(repeat):
+        loops = 0
+        elapsed = 0.0
+        while elapsed < min_time or loops == 0:
+            if setup:
+                setup()
+            start = time.perf_counter()
+            run()
+            elapsed += time.perf_counter() - start
+            loops += 1
+        timings.append(elapsed / loops)
+    return min(timings), statistics.median(timings)
+
+
+def bench_resolve_sales(num_ais, factories, demand_scale, backend):
+    world = make_world(num_ais, factories, demand_scale, backend=backend)
+    if backend == "numpy":
+        run = lambda: world._vector_engine.resolve_sales(world)
+    else:
+        run = world._resolve_sales
+    return measure(run, setup=lambda: _restock(world))
+
+
+def bench_calculate_production(num_ais, factories, backend):
+    world = make_world(num_ais, factories, backend=backend)
+    if backend == "numpy":
+        run = lambda: world._vector_engine.calculate_production(world)
+    else:
+        run = world._calculate_production
+    return measure(run)
+
+
+def bench_apply_ai_actions(num_ais, factories):
+    world = make_world(num_ais, factories)
+    return measure(world._apply_ai_actions)
+
+
+def bench_set_production_lines(factories):
+    world = make_world(1, factories)
+    company = world.companies[1]
+    country = COUNTRIES[1]
+    state = {"qty": 0}
+
+    def run():
+        # Alternates between emptying and refilling the product across all factories
+        state["qty"] = 0 if state["qty"] else 10 * factories
+        company.set_production_lines(country, "A", state["qty"])
+    return measure(run)
+
+
+def bench_get_turn_data(turns):
+    generator = MarketGenerator(total_turns=turns, seed=0)
+    return measure(lambda: [generator.get_turn_data(t) for t in range(1, turns + 1)])
+
+
+def bench_full_game(num_ais, turns, backend):
+    def run():
+        world = World(total_turns=turns, num_ais=num_ais, verbose=False, seed=0, backend=backend)
+        while not world.is_game_over():
+            world.resolve_turn()
+    return measure(run, repeat=3, min_time=0)
+
+
+def _points(sweep):
+    """Yields (name, params, benchmark function, args) for every point of a sweep."""
+    for backend in sweep["backend"]:
+        for num_ais in sweep["num_ais"]:
+            for factories in sweep["factories"]:
+                for demand_scale in sweep["demand_scale"]:
+                    params = {"num_ais": num_ais, "factories": factories,
+                              "demand_scale": demand_scale, "backend": backend}
+                    yield ("resolve_sales", params, bench_resolve_sales,
+                           (num_ais, factories, demand_scale, backend))
+                params = {"num_ais": num_ais, "factories": factories, "backend": backend}
+                yield ("calculate_production", params, bench_calculate_production,
+                       (num_ais, factories, backend))
+            for turns in sweep["turns"]:
+                params = {"num_ais": num_ais, "turns": turns, "backend": backend}
+                yield "full_game", params, bench_full_game, (num_ais, turns, backend)
+
+    for num_ais in sweep["num_ais"]:
+        for factories in sweep["factories"]:
+            params = {"num_ais": num_ais, "factories": factories}
+            yield "apply_ai_actions", params, bench_apply_ai_actions, (num_ais, factories)
+    for factories in sweep["factories"]:
+        yield "set_production_lines", {"factories": factories}, bench_set_production_lines, (factories,)
+    for turns in sweep["turns"]:
+        yield "get_turn_data", {"turns": turns}, bench_get_turn_data, (turns,)
+
+
+def run_suite(sweep, only=None):
+    """Yields one result dict per benchmark and parameter point.
+    only: run just the benchmarks whose name contains this text.
+    """
+    for name, params, bench, args in _points(sweep):
+        if only and only not in name:
+            continue
+        best, median = bench(*args)
+        yield {"name": name, "params": params, "best": best, "median": median}
+
+
+def result_key(result):
+    """Identifies a benchmark point across runs."""
+    params = ",".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+    return f"{result['name']}[{params}]"
+
+
+def compare(baseline, runs, threshold=0.25, floor_ms=0.1):
+    """Returns (key, baseline seconds, current seconds, ratio, regressed) for points present in
+    the baseline and every run, comparing median times. The current time is the fastest run's:
+    a point regressed only if it is more than threshold and floor_ms slower in all of them.
+    """
+    base = {result_key(r): r for r in baseline["results"]}
+    medians = [{result_key(r): r["median"] for r in run["results"]} for run in runs]
+    rows = []
+    for key in medians[0]:
+        if key not in base or any(key not in run for run in medians):
+            continue
+        before = base[key]["median"]
+        after = min(run[key] for run in medians)
+        ratio = after / before if before else float("inf")
+        regressed = ratio > 1 + threshold and (after - before) * 1000 > floor_ms
+        rows.append((key, before, after, ratio, regressed))
+    return rows
+
+
+def merge(runs):
+    """One report from several runs of the same sweep: per point, the best time and the median
+    of the runs' medians. Keeps the first run's meta.
+    """
+    medians = {}
+    bests = {}
+    for run in runs:
+        for result in run["results"]:
+            key = result_key(result)
+            medians.setdefault(key, []).append(result["median"])
+            bests[key] = min(bests.get(key, result["best"]), result["best"])
+    results = []
+    for result in runs[0]["results"]:
+        key = result_key(result)
+        if len(medians[key]) == len(runs):
+            results.append(dict(result, best=bests[key], median=statistics.median(medians[key])))
+    return {"meta": dict(runs[0]["meta"], runs=len(runs)), "results": results}
+
+
+def write_report(report, output):
+    text = json.dumps(report, indent=1)
+    if output == "-":
+        print(text)
+    else:
+        with open(output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+
+def load_reports(paths):
+    reports = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            reports.append(json.load(f))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engine benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmark sweep")
+    run_parser.add_argument("--quick", action="store_true", help="small sweep")
+    run_parser.add_argument("--only", default=None, help="only benchmarks whose name contains this text")
+    run_parser.add_argument("--output", default="-", help="JSON results file ('-' for stdout)")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions against a baseline")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current", nargs="+",
+                                help="results of one or more runs; a slowdown must show in all of them")
+    compare_parser.add_argument("--threshold", type=float, default=0.25,
+                                help="allowed slowdown ratio (0.25 = 25%% slower)")
+    compare_parser.add_argument("--floor-ms", type=float, default=0.1,
+                                help="slowdowns of at most this many milliseconds are ignored")
+
+    baseline_parser = commands.add_parser("baseline", help="merge several runs into a baseline")
+    baseline_parser.add_argument("runs", nargs="+")
+    baseline_parser.add_argument("--output", default="-", help="JSON baseline file ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        results = []
+        for result in run_suite(SWEEPS["quick" if args.quick else "full"], args.only):
+            results.append(result)
+            print(f"{result_key(result):70s} {result['best'] * 1000:10.3f} ms", file=sys.stderr)
+        report = {
+            "meta": {
+                "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "numpy": np.__version__,
+            },
+            "results": results,
+        }
+        write_report(report, args.output)
+        return
+    if args.command == "baseline":
+        write_report(merge(load_reports(args.runs)), args.output)
+        return
+
+    [baseline] = load_reports([args.baseline])
+    runs = load_reports(args.current)
+    rows = compare(baseline, runs, args.threshold, args.floor_ms)
+    regressions = 0
+    for key, before, after, ratio, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        regressions += regressed
+        print(f"{key:70s} {before * 1000:10.3f} -> {after * 1000:10.3f} ms  x{ratio:5.2f} {flag}")
+    print(f"{len(rows)} benchmarks compared over {len(runs)} runs, {regressions} regressions "
+          f"(threshold {args.threshold:.0%}, floor {args.floor_ms} ms)")
+    if regressions:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
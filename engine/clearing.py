@@ -0,0 +1,130 @@
+from itertools import groupby
+
+# Ways of splitting a price tier's demand between tied sellers
+TIE_SPLIT_MODES = ["round_robin", "proportional"]
+
+
+def split_round_robin(stocks, demand):
+    """Splits demand between tied sellers as if units were handed out one at a time in seller order.
+    Returns one quantity per seller, computed from the stock levels instead of per unit.
+    """
+    total_stock = sum(stocks)
+    if total_stock <= demand:
+        return list(stocks)
+
+    # Find the number of full rounds every still-active seller can complete
+    ordered = sorted(stocks)
+    remaining_sellers = len(ordered)
+    level = 0
+    remaining_demand = demand
+    for stock in ordered:
+        step = stock - level
+        if step * remaining_sellers > remaining_demand:
+            break
+        remaining_demand -= step * remaining_sellers
+        level = stock
+        remaining_sellers -= 1
+    level += remaining_demand // remaining_sellers
+    leftover = remaining_demand % remaining_sellers
+
+    # Full rounds for everyone, then one extra unit for the first sellers still holding stock
+    quantities = []
+    for stock in stocks:
+        qty = min(stock, level)
+        if stock > level and leftover > 0:
+            qty += 1
+            leftover -= 1
+        quantities.append(qty)
+    return quantities
+
+
+def split_proportional(stocks, demand):
+    """Splits demand between tied sellers in proportion to their stock.
+    Rounding uses largest remainders, ties broken by seller order.
+    """
+    total_stock = sum(stocks)
+    if total_stock <= demand:
+        return list(stocks)
+
+    quantities = []
+    remainders = []
+    for i, stock in enumerate(stocks):
+        qty, rem = divmod(demand * stock, total_stock)
+        quantities.append(qty)
+        remainders.append((-rem, i))
+
+    leftover = demand - sum(quantities)
+    for _, i in sorted(remainders)[:leftover]:
+        quantities[i] += 1
+    return quantities
+
+
+SPLITTERS = {
+    "round_robin": split_round_robin,
+    "proportional": split_proportional,
+}
+
+
+def clear_market(offers, demand, mode="round_robin"):
+    """Clears one market: cheapest price tier first, each tier allocated in a single step.
+    offers: list of (key, price, stock) in seller order.
+    Returns a list of (key, price, quantity) for every seller that sold something.
+    """
+    if mode not in SPLITTERS:
+        raise ValueError(f"Unknown tie split mode: {mode}")
+    split = SPLITTERS[mode]
+
+    results = []
+    remaining_demand = demand
+    # sorted() is stable, so sellers keep their order inside a tier
+    for price, tier in groupby(sorted(offers, key=lambda o: o[1]), key=lambda o: o[1]):
+        if remaining_demand <= 0:
+            break
+        tier = list(tier)
+        quantities = split([o[2] for o in tier], remaining_demand)
+        for (key, _, _), qty in zip(tier, quantities):
+            if qty > 0:
+                results.append((key, price, qty))
+                remaining_demand -= qty
+    return results
+
+
+class LandedCosts:
+    """Per-unit cost of delivering goods made in one country to a market, for one turn.
+
+    unit[(origin, destination, product)] = (transport, taxes): the turn's transport and tax
+    rates between the two countries applied to the product's reference value (center of its
+    price range). origins[(destination, product)] lists origins cheapest first, the order in
+    which a seller's stock is shipped.
+    """
+    __slots__ = ("unit", "origins")
+
+    def __init__(self, turn_data):
+        transport = turn_data["transport_matrix"]
+        tax = turn_data["tax_matrix"]
+        self.unit = {}
+        self.origins = {}
+        for product, meta in turn_data["products_meta"].items():
+            price_range = meta["price_range"]
+            value = price_range[len(price_range) // 2]
+            for destination in transport:
+                for origin in transport:
+                    self.unit[(origin, destination, product)] = (value * transport[origin][destination],
+                                                                 value * tax[origin][destination])
+                self.origins[(destination, product)] = tuple(sorted(
+                    transport, key=lambda origin: sum(self.unit[(origin, destination, product)])))
+
+    def ship(self, inventory, product, destination, qty):
+        """Takes qty units of a product from an Inventory for a market, cheapest origins first.
+        Returns the (transport, taxes) paid, rounded to whole currency units.
+        Raises ValueError for stock made in a country without landed costs (nothing ships free).
+        """
+        transport = taxes = 0.0
+        for origin, n in inventory.take(product, qty, self.origins.get((destination, product), ())):
+            unit = self.unit.get((origin, destination, product))
+            if unit is None:
+                raise ValueError(f"No landed cost from {origin} to {destination} for {product}")
+            unit_transport, unit_taxes = unit
+            transport += n * unit_transport
+            taxes += n * unit_taxes
+        return round(transport), round(taxes)
@@ -0,0 +1,151 @@
+import json
+import threading
+
+from engine.metrics import METRICS
+
+PUSH_MESSAGES = METRICS.counter("push_messages_serialized_total",
+                                "Server-sent event messages serialized, by event (shared by all subscribers).",
+                                labels=("event",))
+PUSH_SUBSCRIPTIONS = METRICS.counter("push_subscriptions_total", "Server-sent event streams opened.")
+
+# Comment line sent on idle streams, so proxies keep them open and closed clients are noticed
+KEEPALIVE = b": keepalive\n\n"
+
+
+def sse_message(event, seq, data):
+    """One server-sent event, encoded once and written as is to every subscriber."""
+    PUSH_MESSAGES.inc(event=event)
+    return f"id: {seq}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+
+
+class GameChannel:
+    """Push channel of one game: the player and any number of spectators follow its state.
+
+    While the channel has subscribers, one watcher thread checks the game's stored version
+    (every poll_interval, or at once after notify) and, when it moved, loads the state and
+    publishes it: a "state" message with everything and a "delta" message with the keys that
+    changed, each serialized once. Subscribers get the full state when they connect, then the
+    deltas; one that fell more than a message behind gets the full state again.
+    """
+    def __init__(self, game_id, version, load_state, poll_interval=0.5, keepalive=15.0, on_idle=None):
+        self.game_id = game_id
+        self._version = version        # game_id -> hashable stored version (None if unknown)
+        self._load_state = load_state  # game_id -> state dict (JSON-serializable)
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self._on_idle = on_idle
+        self._cond = threading.Condition()
+        self.seq = 0
+        self.state = None
+        self._full = None   # "state" message of seq
+        self._delta = None  # "delta" message from seq - 1 to seq
+        self.subscribers = 0
+        self._watching = False
+        self._changed = False
+
+    def notify(self):
+        """Asks the watcher to check the game now (e.g. after a request changed it)."""
+        with self._cond:
+            self._changed = True
+            self._cond.notify_all()
+
+    def subscribe(self, last_event_id=None):
+        """Yields the messages (bytes) of a subscriber until the client goes away.
+        last_event_id: the id of the last message a reconnecting client saw.
+        """
+        with self._cond:
+            self.subscribers += 1
+            PUSH_SUBSCRIPTIONS.inc()
+            if not self._watching:
+                self._watching = True
+                threading.Thread(target=self._watch, name=f"channel-{self.game_id}", daemon=True).start()
+        try:
+            with self._cond:
+                self._cond.wait_for(lambda: self._full is not None, timeout=self.keepalive)
+                seen, message = self.seq, self._full
+            if message is None:
+                message = KEEPALIVE
+            elif last_event_id == str(seen):
+                message = KEEPALIVE  # already up to date
+            while True:
+                yield message
+                with self._cond:
+                    self._cond.wait_for(lambda: self.seq != seen, timeout=self.keepalive)
+                    if self.seq == seen:
+                        message = KEEPALIVE
+                    elif self.seq == seen + 1:
+                        message = self._delta
+                    else:
+                        message = self._full
+                    seen = self.seq
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+                self._cond.notify_all()
+
+    def _watch(self):
+        version = None
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._changed or not self.subscribers, timeout=self.poll_interval)
+                self._changed = False
+                if not self.subscribers:
+                    self._watching = False
+                    break
+            try:
+                current = self._version(self.game_id)
+                if current != version or self._full is None:
+                    version = current
+                    self._publish(self._load_state(self.game_id))
+            except Exception:
+                # Retried on the next poll; a broken game must not kill the channel
+                version = None
+        if self._on_idle:
+            self._on_idle(self)
+
+    def _publish(self, state):
+        previous = self.state or {}
+        delta = {key: value for key, value in state.items() if previous.get(key) != value}
+        if not delta and self._full is not None:
+            return
+        with self._cond:
+            self.seq += 1
+            self.state = state
+            self._full = sse_message("state", self.seq, state)
+            self._delta = sse_message("delta", self.seq, delta)
+            self._cond.notify_all()
+
+
+class GameChannels:
+    """The push channels of a process, one per watched game (dropped when nobody watches)."""
+    def __init__(self, version, load_state, poll_interval=0.5, keepalive=15.0):
+        self._version = version
+        self._load_state = load_state
+        self.poll_interval = poll_interval
+        self.keepalive = keepalive
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def channel(self, game_id):
+        with self._lock:
+            channel = self._channels.get(game_id)
+            if channel is None:
+                channel = self._channels[game_id] = GameChannel(
+                    game_id, self._version, self._load_state, self.poll_interval, self.keepalive,
+                    on_idle=self._drop)
+            return channel
+
+    def _drop(self, channel):
+        with self._lock:
+            if channel.subscribers == 0 and self._channels.get(channel.game_id) is channel:
+                del self._channels[channel.game_id]
+
+    def notify(self, game_id):
+        """Wakes the game's channel, if anyone watches it."""
+        with self._lock:
+            channel = self._channels.get(game_id)
+        if channel is not None:
+            channel.notify()
+
+    def __len__(self):
+        return len(self._channels)
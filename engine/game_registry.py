@@ -0,0 +1,328 @@
+import json
+import os
+import random
+import re
+import secrets
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from engine import snapshot
+from engine.action_log import ActionLog, replay
+
+# Game ids become file names, so keep them to a safe alphabet
+GAME_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    game_id TEXT PRIMARY KEY,
+    generation TEXT NOT NULL,   -- changes when a game id is reused for a new game
+    header TEXT NOT NULL,       -- action log header: config (with seed) and optional base snapshot
+    updated REAL NOT NULL,      -- time of the last stored action (or of the creation)
+    spectator TEXT NOT NULL UNIQUE  -- read-only token of the game's live view (never the game id)
+);
+CREATE TABLE IF NOT EXISTS actions (
+    game_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entry TEXT NOT NULL,
+    PRIMARY KEY (game_id, seq)
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    game_id TEXT PRIMARY KEY,
+    generation TEXT NOT NULL,
+    seq INTEGER NOT NULL,       -- the game after its actions 0..seq-1
+    turn INTEGER NOT NULL,
+    data BLOB NOT NULL          -- engine/snapshot.py
+);
+"""
+
+# A game's stored snapshot is refreshed every SNAPSHOT_TURNS turns, so a worker catching up
+# never resolves again a turn another worker already resolved
+SNAPSHOT_TURNS = 1
+# Games without a stored action for MAX_AGE seconds are deleted (checked every EXPIRE_INTERVAL)
+MAX_AGE = 30 * 24 * 3600
+EXPIRE_INTERVAL = 3600
+
+
+class _FileLock:
+    """Exclusive lock on a file, held across processes (blocks until acquired)."""
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        self._file = open(self.path, "a+b")
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass  # LK_LOCK gives up after 10 s: keep waiting
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+
+class GameRegistry:
+    """Holds one World per game id (one per browser session).
+
+    Games are stored in SQLite (WAL mode, storage_dir/games.db) as action logs, so every
+    worker process and thread serves the same games. Work on a game happens under its
+    lock (locked): the process's cached World first catches up with actions stored by
+    other workers, and the actions it logs are stored when the lock is released.
+    A World that is not cached, or is behind the game's latest snapshot (stored every
+    snapshot_turns turns), is loaded from that snapshot and the actions after it.
+    At most max_loaded Worlds stay cached per process: the budget is a number of games, not
+    of bytes (a World's size grows with its number of AIs).
+    Games without a stored action for max_age seconds are deleted by expire(), which
+    create() runs at most every EXPIRE_INTERVAL.
+    """
+    def __init__(self, max_loaded=200, storage_dir="saved_games", snapshot_turns=SNAPSHOT_TURNS,
+                 max_age=MAX_AGE):
+        self.max_loaded = max(1, int(max_loaded))
+        self.snapshot_turns = max(1, int(snapshot_turns))
+        self.max_age = max_age
+        self._expired_at = 0.0
+        self.storage_dir = storage_dir
+        self.lock_dir = os.path.join(storage_dir, "locks")
+        os.makedirs(self.lock_dir, exist_ok=True)
+        self.db_path = os.path.join(storage_dir, "games.db")
+        # game_id -> [World, generation, stored actions, entries of world.action_log stored, snapshot turn],
+        # most recently used last
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+        self._game_locks = {}        # game_id -> threading.Lock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        """SQLite connection of the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _check_id(self, game_id):
+        if not GAME_ID_PATTERN.fullmatch(game_id or ""):
+            raise ValueError(f"Invalid game id: {game_id!r}")
+
+    def _thread_lock(self, game_id):
+        with self._lock:
+            return self._game_locks.setdefault(game_id, threading.Lock())
+
+    def _lock_path(self, game_id):
+        return os.path.join(self.lock_dir, f"{game_id}.lock")
+
+    @contextmanager
+    def _game_lock(self, game_id):
+        """Per-game lock across threads (threading.Lock) and processes (lock file)."""
+        self._check_id(game_id)
+        with self._thread_lock(game_id), _FileLock(self._lock_path(game_id)):
+            yield
+
+    def create(self, game_id, **config):
+        """Starts a new game under game_id, replacing any previous one. Returns its config.
+        Only the config is stored: the World is built on first use (locked), by whichever
+        worker serves the game.
+        """
+        config = dict(config)
+        if config.get("seed") is None:
+            config["seed"] = random.randrange(2**32)
+        generation = uuid.uuid4().hex
+        spectator = secrets.token_urlsafe(16)
+        header = ActionLog(config)._header()
+        if time.time() - self._expired_at >= EXPIRE_INTERVAL:
+            self.expire()
+        with self._game_lock(game_id):
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM actions WHERE game_id = ?", (game_id,))
+                conn.execute("DELETE FROM snapshots WHERE game_id = ?", (game_id,))
+                conn.execute("INSERT OR REPLACE INTO games VALUES (?, ?, ?, ?, ?)",
+                             (game_id, generation, json.dumps(header), time.time(), spectator))
+            with self._lock:
+                self._games.pop(game_id, None)
+        return config
+
+    @contextmanager
+    def locked(self, game_id):
+        """Holds the game's lock and yields its up-to-date World (None if unknown).
+        Actions logged meanwhile are stored on exit.
+        """
+        with self._game_lock(game_id):
+            entry = self._sync(game_id)
+            if entry is None:
+                yield None
+                return
+            try:
+                yield entry[0]
+            finally:
+                self._store(game_id, entry)
+
+    def get(self, game_id):
+        """Returns the game's World, up to date with every worker (None if unknown).
+        Use locked() to change it.
+        """
+        with self.locked(game_id) as world:
+            return world
+
+    def version(self, game_id):
+        """Stored version of a game, (generation, last action seq), without loading it (None if unknown).
+        Changes whenever any worker stores an action or replaces the game.
+        """
+        row = self._connect().execute(
+            "SELECT generation, (SELECT MAX(seq) FROM actions WHERE game_id = ?) FROM games WHERE game_id = ?",
+            (game_id, game_id)).fetchone()
+        return tuple(row) if row else None
+
+    def _sync(self, game_id):
+        """Returns the cache entry of a game, loaded or caught up from the database (caller holds the lock)."""
+        conn = self._connect()
+        row = conn.execute("SELECT generation, header FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        if row is None:
+            with self._lock:
+                self._games.pop(game_id, None)
+            return None
+        generation, header = row
+        with self._lock:
+            entry = self._games.get(game_id)
+        saved = conn.execute("SELECT seq, turn FROM snapshots WHERE game_id = ? AND generation = ?",
+                             (game_id, generation)).fetchone()
+        # Behind the snapshot: loading it is cheaper than resolving the turns it holds again
+        if entry is None or entry[1] != generation or (saved and saved[0] > entry[2]):
+            seq, turn = saved if saved else (0, 1)
+            data = conn.execute("SELECT data FROM snapshots WHERE game_id = ?",
+                                (game_id,)).fetchone()[0] if saved else None
+            entries = [json.loads(e) for (e,) in conn.execute(
+                "SELECT entry FROM actions WHERE game_id = ? AND seq >= ? ORDER BY seq", (game_id, seq))]
+            log = ActionLog.from_header(json.loads(header), entries)
+            if data is not None:
+                log.base = data
+            world = replay(log)
+            entry = [world, generation, seq + len(entries), len(world.action_log), turn]
+        else:
+            world = entry[0]
+            try:
+                for (e,) in conn.execute("SELECT entry FROM actions WHERE game_id = ? AND seq >= ? ORDER BY seq",
+                                         (game_id, entry[2])):
+                    action = json.loads(e)
+                    world.apply_action(action["action"], action["args"])
+                    entry[2] += 1
+            except Exception:
+                # The cached World no longer matches the stored game: never serve it
+                with self._lock:
+                    self._games.pop(game_id, None)
+                raise
+            # Actions replayed from the database are logged again by the World: already stored
+            entry[3] = len(world.action_log)
+        self._cache(game_id, entry)
+        return entry
+
+    def _store(self, game_id, entry):
+        """Writes the actions logged since the last store, and a new snapshot once snapshot_turns
+        turns went by since the last one (caller holds the lock).
+        """
+        world, generation, stored, logged, snapshot_turn = entry
+        new = world.action_log.entries[logged:]
+        if not new:
+            return
+        conn = self._connect()
+        with conn:
+            conn.executemany("INSERT INTO actions VALUES (?, ?, ?)",
+                             [(game_id, stored + i, json.dumps(e)) for i, e in enumerate(new)])
+            conn.execute("UPDATE games SET updated = ? WHERE game_id = ?", (time.time(), game_id))
+            if world.turn >= snapshot_turn + self.snapshot_turns:
+                conn.execute("INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)",
+                             (game_id, generation, stored + len(new), world.turn, snapshot.dump(world)))
+                entry[4] = world.turn
+        entry[2] = stored + len(new)
+        entry[3] = logged + len(new)
+
+    def _cache(self, game_id, entry):
+        with self._lock:
+            self._games[game_id] = entry
+            self._games.move_to_end(game_id)
+            # Evicted games are already stored: they are replayed on their next use
+            while len(self._games) > self.max_loaded:
+                self._games.popitem(last=False)
+
+    def discard(self, game_id):
+        """Forgets a game, in memory, in the database and its locks."""
+        with self._game_lock(game_id):
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM actions WHERE game_id = ?", (game_id,))
+                conn.execute("DELETE FROM snapshots WHERE game_id = ?", (game_id,))
+                conn.execute("DELETE FROM games WHERE game_id = ?", (game_id,))
+            with self._lock:
+                self._games.pop(game_id, None)
+                # Anyone still waiting on the old lock finds no game once it gets it
+                self._game_locks.pop(game_id, None)
+        try:
+            os.remove(self._lock_path(game_id))
+        except OSError:
+            pass  # already removed, or still open in another process (Windows)
+
+    def expire(self, max_age=None):
+        """Discards the games without a stored action for max_age seconds (default: self.max_age).
+        Returns their ids.
+        """
+        max_age = self.max_age if max_age is None else max_age
+        self._expired_at = time.time()
+        game_ids = [game_id for (game_id,) in self._connect().execute(
+            "SELECT game_id FROM games WHERE updated < ?", (self._expired_at - max_age,))]
+        for game_id in game_ids:
+            self.discard(game_id)
+        return game_ids
+
+    def save_all(self):
+        """Stores the pending actions of every cached game (e.g. before shutdown)."""
+        with self._lock:
+            game_ids = list(self._games)
+        for game_id in game_ids:
+            with self._game_lock(game_id):
+                with self._lock:
+                    entry = self._games.get(game_id)
+                if entry is not None:
+                    self._store(game_id, entry)
+
+    def spectator_token(self, game_id):
+        """Token of the game's read-only live view (None if unknown); a new game gets a new one."""
+        row = self._connect().execute("SELECT spectator FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row[0] if row else None
+
+    def spectated(self, token):
+        """Id of the game whose spectator token this is (None if none)."""
+        row = self._connect().execute("SELECT game_id FROM games WHERE spectator = ?", (token,)).fetchone()
+        return row[0] if row else None
+
+    def __contains__(self, game_id):
+        row = self._connect().execute("SELECT 1 FROM games WHERE game_id = ?", (game_id,)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return len(self._games)
@@ -0,0 +1,98 @@
+import struct
+from collections import namedtuple
+
+# One fixed-width record per company per turn: (name, struct format).
+# Money is stored as doubles: costs from the country config may be fractional.
+FIELDS = [
+    ("turn", "i"),
+    ("cash", "d"),
+    ("revenue", "d"),
+    ("production_cost", "d"),
+    ("maintenance_cost", "d"),
+    ("marketing_cost", "d"),
+    ("transport_cost", "d"),
+    ("taxes", "d"),
+    ("stock", "q"),        # units in stock after sales, all products and origins
+    ("lines", "i"),        # production lines, all countries and products
+    ("factories", "i"),
+    ("units_sold", "q"),
+    ("market_share", "f"), # share of all units sold this turn
+]
+FIELD_NAMES = [name for name, _ in FIELDS]
+RECORD = struct.Struct("<" + "".join(fmt for _, fmt in FIELDS))
+
+KpiRecord = namedtuple("KpiRecord", FIELD_NAMES)
+
+
+class KpiSeries:
+    """Per-turn KPIs of every company, packed as fixed-width records (RECORD.size bytes each).
+    A 20-turn game of 10 companies takes a few kilobytes, so charts and post-game analytics
+    read them directly instead of replaying the game.
+    """
+    def __init__(self):
+        self._data = {}  # company name -> bytearray of records, oldest turn first
+
+    def __getstate__(self):
+        """{company: bytes}, used by pickle and engine/snapshot.py."""
+        return {name: bytes(data) for name, data in self._data.items()}
+
+    def __setstate__(self, state):
+        self._data = {name: bytearray(data) for name, data in state.items()}
+
+    def record_turn(self, turn, companies, units_sold):
+        """Appends the turn's record of each company. units_sold: {company name: units sold this turn}."""
+        total_sold = sum(units_sold.values())
+        for company in companies:
+            costs = company.costs
+            sold = units_sold.get(company.name, 0)
+            record = RECORD.pack(
+                turn, company.cash, company.revenue,
+                costs.get("production", 0), costs.get("maintenance", 0), costs.get("marketing", 0),
+                costs.get("transport", 0), costs.get("taxes", 0),
+                sum(company.stock.values()), sum(company.line_totals.used.values()),
+                company.line_totals.factory_count, sold,
+                sold / total_sold if total_sold else 0.0)
+            self._data.setdefault(company.name, bytearray()).extend(record)
+
+    def companies(self):
+        return list(self._data)
+
+    def __len__(self):
+        """Number of turns recorded (for the company with the most)."""
+        return max((len(data) // RECORD.size for data in self._data.values()), default=0)
+
+    def _slice(self, company_name, turns):
+        """Bytes of a company's records for a slice of turn numbers (slice(None) for all)."""
+        data = self._data.get(company_name)
+        if not data:
+            return memoryview(b"")
+        first = RECORD.unpack_from(data, 0)[0]
+        count = len(data) // RECORD.size
+        start, stop, step = slice(
+            None if turns.start is None else turns.start - first,
+            None if turns.stop is None else turns.stop - first,
+            turns.step).indices(count)
+        if step != 1:
+            raise ValueError("Turn slices must be contiguous")
+        return memoryview(data)[start * RECORD.size:max(start, stop) * RECORD.size]
+
+    def records(self, company_name, turns=slice(None)):
+        """KpiRecords of a company for a slice of turn numbers, e.g. slice(5, 10) for turns 5 to 9."""
+        return [KpiRecord._make(values) for values in RECORD.iter_unpack(self._slice(company_name, turns))]
+
+    def column(self, company_name, field, turns=slice(None)):
+        """Values of one field of a company for a slice of turn numbers."""
+        i = FIELD_NAMES.index(field)
+        return [values[i] for values in RECORD.iter_unpack(self._slice(company_name, turns))]
+
+    def to_dict(self, turns=slice(None)):
+        """{company: {field: [values]}}, one list per field (e.g. for charts)."""
+        result = {}
+        for name in self._data:
+            rows = list(RECORD.iter_unpack(self._slice(name, turns)))
+            result[name] = {field: [row[i] for row in rows] for i, field in enumerate(FIELD_NAMES)}
+        return result
+
+    @property
+    def nbytes(self):
+        return sum(len(data) for data in self._data.values())
@@ -1,9 +1,81 @@
-import random
+from functools import lru_cache
+from types import MappingProxyType
+
+from engine.rng import derive_rng
+
+
+def _frozen(table):
+    """Read-only view of a nested dict, safe to share between games."""
+    return MappingProxyType({k: _frozen(v) if isinstance(v, dict) else v for k, v in table.items()})
+
+
+# Static tables: built once per process and shared read-only by every turn of every game
+TRANSPORT_MATRIX = _frozen({
+    "France": {"France": 0.00, "USA": 0.05, "China": 0.25},
+    "USA": {"France": 0.05, "USA": 0.00, "China": 0.20},
+    "China": {"France": 0.25, "USA": 0.20, "China": 0.00}
+})
+
+TAX_MATRIX = _frozen({
+    "France": {"France": 0.05, "USA": 0.08, "China": 0.15},
+    "USA": {"France": 0.08, "USA": 0.04, "China": 0.12},
+    "China": {"France": 0.10, "USA": 0.12, "China": 0.05}
+})
+
+COUNTRIES = ("France", "USA", "China")
+
+MARKETING_META = _frozen({"budget_marketing": (0, 1000, 2000, 5000, 10000)})
+
+
+@lru_cache(maxsize=None)
+def _price_range(center_price, spread):
+    """Price options around a center price; identical ranges are shared across turns and games."""
+    return tuple(center_price - spread + i for i in range(spread * 2 + 1))
+
+
+def price_spread(product):
+    """Number of price options on each side of a product's center price."""
+    return 3 if product == "A" else 5
+
+
+def build_turn_data(multiplier, event, price_centers, demand, countries_config):
+    """Assembles the turn data dict from a turn's climate, price centers {product: price}
+    and demand {product: {country: units}}. Shared by MarketGenerator and scenario banks.
+    """
+    data = {
+        "global": {"event": event, "economic_index": round(multiplier, 2)},
+        "products_meta": {},
+        "marketing_meta": MARKETING_META,
+        "countries": {},
+        "transport_matrix": TRANSPORT_MATRIX,
+        "tax_matrix": TAX_MATRIX
+    }
+
+    for prod, center_price in price_centers.items():
+        price_range = _price_range(center_price, price_spread(prod))
+        data["products_meta"][prod] = {
+            "description": f"Product {prod}",
+            "price_options": price_range,
+            "price_range": price_range
+        }
+
+        for country, final_demand in demand[prod].items():
+            if country not in data["countries"]:
+                data["countries"][country] = {
+                    "products": {},
+                    "integration_bonus": countries_config[country]["integration_bonus"]
+                }
+            data["countries"][country]["products"][prod] = {"base_demand": final_demand}
+
+    return data
+
 
 class MarketGenerator:
     """Generates dynamic market conditions including demand, prices, and economic events."""
-    def __init__(self,total_turns=20):
+    def __init__(self,total_turns=20, seed=None):
         self.total_turns = total_turns
+        # Each turn draws from its own stream, so turn data only depends on (seed, turn)
+        self.seed = seed
         self.base_config = {
             "products": {
                 # A: Low Cost - Massive volume (requires ~10 factories to cover)
@@ -31,44 +103,20 @@ class MarketGenerator:
 
     def get_turn_data(self, turn):
         """Generates dynamic turn data based on current turn."""
-        multiplier, event = self._get_climate(turn)
-        
-        data = {
-            "global": {"event": event, "economic_index": round(multiplier, 2)},
-            "products_meta": {},
-            "marketing_meta": {"budget_marketing": [0, 1000, 2000, 5000, 10000]},
-            "countries": {},
-            "transport_matrix": self._generate_transport_matrix(),
-            "tax_matrix": self._generate_tax_matrix()
-        }
+        rng = derive_rng(self.seed, "market", turn)
+        multiplier, event = self._get_climate(turn, rng)
 
-        # Generate prices and demand
+        # Prices and demand (draw order is part of the seed contract: product, then country)
+        price_centers = {}
+        demand = {}
         for prod, info in self.base_config["products"].items():
-            center_price = int(info["base_price"] * multiplier)
-            spread = 3 if prod == "A" else 5
-            price_range = [center_price - spread + i for i in range(spread * 2 + 1)]
-            
-            data["products_meta"][prod] = {
-                "description": f"Product {prod}",
-                "price_options": price_range,
-                "price_range": price_range
-            }
+            price_centers[prod] = int(info["base_price"] * multiplier)
+            demand[prod] = {country: int(info["base_demand"][country] * multiplier * rng.uniform(0.95, 1.05))
+                            for country in COUNTRIES}
 
-            for country in ["France", "USA", "China"]:
-                base_dem = info["base_demand"][country]
-                final_demand = int(base_dem * multiplier * random.uniform(0.95, 1.05))
-                
-                if country not in data["countries"]:
-                    data["countries"][country] = {
-                        "products": {},
-                        "integration_bonus": self.base_config["countries"][country]["integration_bonus"]
-                    }
-                
-                data["countries"][country]["products"][prod] = {"base_demand": final_demand}
-
-        return data
+        return build_turn_data(multiplier, event, price_centers, demand, self.base_config["countries"])
     
-    def _get_climate(self, turn):
+    def _get_climate(self, turn, rng):
         """Determines economic climate based on turn with randomness."""
         # Phase 1: Early stability (turns 1-2)
         if turn <= 2:
@@ -80,42 +128,34 @@ class MarketGenerator:
             progress = (turn - 2) / (int(self.total_turns * 0.6) - 2)
             base_multiplier = 1.0 + (progress * 0.15)
             # Random event: 30% chance of boom, 20% chance of dip
-            rand = random.random()
+            rand = rng.random()
             if rand < 0.3:
-                base_multiplier *= random.uniform(1.05, 1.15)
+                base_multiplier *= rng.uniform(1.05, 1.15)
                 event = "Boom"
             elif rand < 0.5:
-                base_multiplier *= random.uniform(0.92, 0.98)
+                base_multiplier *= rng.uniform(0.92, 0.98)
                 event = "Dip"
             else:
                 event = "Growth"
         
         # Phase 3: Crisis period (60% to 80% of game)
         elif turn <= int(self.total_turns * 0.8):
-            base_multiplier = random.uniform(0.65, 0.85)
+            base_multiplier = rng.uniform(0.65, 0.85)
             event = "Recession"
         
         # Phase 4: Recovery (80% to end)
         else:
             progress = (turn - int(self.total_turns * 0.8)) / (self.total_turns - int(self.total_turns * 0.8))
             base_multiplier = 0.7 + (progress * 0.35)
-            base_multiplier *= random.uniform(0.98, 1.05)
+            base_multiplier *= rng.uniform(0.98, 1.05)
             event = "Recovery"
         
         return round(base_multiplier, 2), event
 
     def _generate_transport_matrix(self):
-        """Generates transport cost matrix between countries."""
-        return {
-            "France": {"France": 0.00, "USA": 0.05, "China": 0.25},
-            "USA": {"France": 0.05, "USA": 0.00, "China": 0.20},
-            "China": {"France": 0.25, "USA": 0.20, "China": 0.00}
-        }
+        """Returns the transport cost matrix between countries (shared, read-only)."""
+        return TRANSPORT_MATRIX
 
     def _generate_tax_matrix(self):
-        """Generates tax matrix between countries."""
-        return {
-            "France": {"France": 0.05, "USA": 0.08, "China": 0.15},
-            "USA": {"France": 0.08, "USA": 0.04, "China": 0.12},
-            "China": {"France": 0.10, "USA": 0.12, "China": 0.05}
-        }
\ No newline at end of file
+        """Returns the tax matrix between countries (shared, read-only)."""
+        return TAX_MATRIX
@@ -0,0 +1,121 @@
+"""In-process metrics (counters and latency histograms) in Prometheus text format.
+
+Metrics live in one registry per process (METRICS); main.py exposes it on /metrics.
+"""
+import threading
+from bisect import bisect_left
+
+# Latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Counter:
+    """Monotonic counter, optionally split by labels."""
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name + _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """Distribution of observed values (e.g. seconds) over fixed buckets, optionally split by labels."""
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield self.name + "_bucket" + _format_labels(self.labels, key, ("le", repr(bound))), cumulative
+            yield self.name + "_bucket" + _format_labels(self.labels, key, ("le", "+Inf")), series[-1]
+            yield self.name + "_sum" + _format_labels(self.labels, key), series[-2]
+            yield self.name + "_count" + _format_labels(self.labels, key), series[-1]
+
+
+class MetricsRegistry:
+    """Named metrics of the process, rendered together."""
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = cls(name, help_text, **kwargs)
+            return self._metrics[name]
+
+    def counter(self, name, help_text, labels=()):
+        return self._get(Counter, name, help_text, labels=labels)
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(Histogram, name, help_text, labels=labels, buckets=buckets)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for sample, value in metric.samples():
+                lines.append(f"{sample} {value}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+# Turn engine metrics (filled by World.resolve_turn)
+TURN_PHASE_SECONDS = METRICS.histogram(
+    "game_turn_phase_seconds", "Time spent in each phase of World.resolve_turn.", labels=("phase",))
+TURNS_RESOLVED = METRICS.counter("game_turns_resolved_total", "Turns resolved.")
+AI_ACTIONS = METRICS.counter("game_ai_actions_total", "AI actions applied (factory purchases, line changes, sales decisions).")
+OFFERS_CONSIDERED = METRICS.counter("game_offers_considered_total", "Sales offers entered into market clearing.")
+UNITS_CLEARED = METRICS.counter("game_units_cleared_total", "Units sold by market clearing.")
@@ -1,14 +1,30 @@
+import random
+from collections import OrderedDict
+
 from engine.market_generator import MarketGenerator
 
 class Parameters:
-    """Manages game parameters and caches turn data."""
-    def __init__(self, total_turns=20):
+    """Manages game parameters and caches turn data.
+    Only the most recently used turns are kept; an evicted turn is regenerated
+    identically because turn data only depends on (seed, turn).
+    generator: any object with get_turn_data(turn) (e.g. a scenario bank market);
+    a seeded MarketGenerator by default.
+    """
+    def __init__(self, total_turns=20, seed=None, cache_size=4, generator=None):
         self.total_turns = total_turns
-        self.generator = MarketGenerator(total_turns=total_turns)
-        self._cache = {}  # caches generated turns
+        # Regeneration must be deterministic, so a seedless game still gets one
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.generator = generator or MarketGenerator(total_turns=total_turns, seed=seed)
+        self.cache_size = max(1, cache_size)
+        self._cache = OrderedDict()  # caches generated turns, least recently used first
 
     def get_turn(self, turn_number):
         """Returns turn parameters (generated or in cache)."""
-        if turn_number not in self._cache:
+        if turn_number in self._cache:
+            self._cache.move_to_end(turn_number)
+        else:
             self._cache[turn_number] = self.generator.get_turn_data(turn_number)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
         return self._cache[turn_number]
\ No newline at end of file
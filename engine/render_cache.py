@@ -0,0 +1,51 @@
+import threading
+from collections import OrderedDict
+
+from engine.metrics import METRICS
+
+CACHE_LOOKUPS = METRICS.counter("render_cache_lookups_total", "Render cache lookups by result (hit or miss).",
+                                labels=("result",))
+
+
+class RenderCache:
+    """Rendered pages and computed view data per game, least recently used evicted first.
+
+    Keys include what the value depends on, e.g. (turn, state version, page) for a page or
+    (turn, "sales_table") for data fixed for a whole turn. Routes that change a game call
+    invalidate, so its stale entries are freed at once instead of aging out.
+    """
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (game_id, key) -> (value, turn_scoped)
+        self._lock = threading.Lock()
+
+    def get(self, game_id, key, build, turn_scoped=False, keep=None):
+        """Returns the cached value for (game_id, key), calling build() on a miss.
+        turn_scoped values survive invalidate() unless turn_data=True.
+        keep(value) can refuse to store a built value (e.g. a redirect instead of a page).
+        """
+        with self._lock:
+            entry = self._entries.get((game_id, key))
+            if entry is not None:
+                self._entries.move_to_end((game_id, key))
+                CACHE_LOOKUPS.inc(result="hit")
+                return entry[0]
+        CACHE_LOOKUPS.inc(result="miss")
+        value = build()
+        if keep is not None and not keep(value):
+            return value
+        with self._lock:
+            self._entries[(game_id, key)] = (value, turn_scoped)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, game_id, turn_data=False):
+        """Drops a game's entries (only the per-version ones unless turn_data)."""
+        with self._lock:
+            for cache_key in [k for k, (_, turn_scoped) in self._entries.items()
+                              if k[0] == game_id and (turn_data or not turn_scoped)]:
+                del self._entries[cache_key]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,15 @@
+import random
+
+
+def stream_seed(seed, *stream):
+    """Seed value of a named stream of a game seed (None stays None, i.e. OS entropy)."""
+    if seed is None:
+        return None
+    return ":".join(str(part) for part in (seed,) + stream)
+
+
+def derive_rng(seed, *stream):
+    """Returns an independent random.Random for a named stream of a game seed.
+    The same (seed, stream) always produces the same sequence; seed None gives an unseeded stream.
+    """
+    return random.Random(stream_seed(seed, *stream))
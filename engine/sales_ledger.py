@@ -0,0 +1,119 @@
+from array import array
+
+
+class SalesLedger:
+    """Aggregated sales records, one row per (country, product, company, price) and turn.
+    Quantities are stored in arrays, so the ledger grows with the number of offers, not units sold.
+    """
+    def __init__(self):
+        self._key_index = {}  # (country, product, company, price) -> key id
+        self._keys = []       # key id -> (country, product, company, price)
+        self._turns = {}      # turn -> (array of key ids, array of quantities)
+        self._demand = {}     # turn -> {(country, product): base_demand}
+
+    def __getstate__(self):
+        """Plain lists and dicts, used by pickle and engine/snapshot.py."""
+        return {
+            "keys": [list(key) for key in self._keys],
+            "turns": {turn: [list(ids), list(qtys)] for turn, (ids, qtys) in self._turns.items()},
+            "demand": {turn: [[c, p, d] for (c, p), d in markets.items()]
+                       for turn, markets in self._demand.items()}
+        }
+
+    def __setstate__(self, state):
+        self._keys = [tuple(key) for key in state["keys"]]
+        self._key_index = {key: i for i, key in enumerate(self._keys)}
+        self._turns = {turn: (array("l", ids), array("l", qtys))
+                       for turn, (ids, qtys) in state["turns"].items()}
+        self._demand = {turn: {(c, p): d for c, p, d in markets}
+                        for turn, markets in state["demand"].items()}
+
+    def _key_id(self, key):
+        """Returns the id of a key, registering it on first use."""
+        key_id = self._key_index.get(key)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._key_index[key] = key_id
+            self._keys.append(key)
+        return key_id
+
+    def record(self, turn, country, product, company_name, price, quantity, base_demand=0):
+        """Adds quantity sold by a company at a price in a market for a turn."""
+        if turn not in self._turns:
+            self._turns[turn] = (array("l"), array("l"))
+        key_ids, quantities = self._turns[turn]
+        key_ids.append(self._key_id((country, product, company_name, price)))
+        quantities.append(quantity)
+        self._demand.setdefault(turn, {})[(country, product)] = base_demand
+
+    def record_many(self, turn, country, product, company_names, prices, quantities, base_demand=0):
+        """Adds the sales of several companies in one market (same as record for each, in order)."""
+        if turn not in self._turns:
+            self._turns[turn] = (array("l"), array("l"))
+        key_ids, stored = self._turns[turn]
+        key_id = self._key_id
+        key_ids.extend(key_id((country, product, name, price)) for name, price in zip(company_names, prices))
+        stored.extend(quantities)
+        self._demand.setdefault(turn, {})[(country, product)] = base_demand
+
+    def turns(self):
+        """Returns the turns with recorded sales, oldest first."""
+        return sorted(self._turns)
+
+    @property
+    def latest_turn(self):
+        """Last turn with recorded sales (None if nothing was sold yet)."""
+        return max(self._turns) if self._turns else None
+
+    def rows(self, turn):
+        """Yields (country, product, company, price, quantity) for a turn."""
+        key_ids, quantities = self._turns.get(turn, ((), ()))
+        for key_id, qty in zip(key_ids, quantities):
+            yield self._keys[key_id] + (qty,)
+
+    def get_demand(self, turn, country, product):
+        """Returns the base demand recorded for a market on a turn."""
+        return self._demand.get(turn, {}).get((country, product), 0)
+
+    # Query helpers
+
+    def overview(self, turn):
+        """Returns the overview table: one entry per market with units sold by company."""
+        table = {}
+        for country, product, company_name, _, qty in self.rows(turn):
+            key = (country, product)
+            if key not in table:
+                table[key] = {
+                    "country": country,
+                    "product": product,
+                    "base_demand": self.get_demand(turn, country, product),
+                    "sales": {}
+                }
+            sales = table[key]["sales"]
+            sales[company_name] = sales.get(company_name, 0) + qty
+        return list(table.values())
+
+    def market_shares(self, turn):
+        """Returns {(country, product): {company: share of units sold}} for a turn."""
+        shares = {}
+        for row in self.overview(turn):
+            total = sum(row["sales"].values())
+            shares[(row["country"], row["product"])] = {
+                name: qty / total for name, qty in row["sales"].items()
+            }
+        return shares
+
+    def revenue_breakdown(self, turn):
+        """Returns {(country, product): {company: revenue}} for a turn."""
+        breakdown = {}
+        for country, product, company_name, price, qty in self.rows(turn):
+            market = breakdown.setdefault((country, product), {})
+            market[company_name] = market.get(company_name, 0) + price * qty
+        return breakdown
+
+    def revenue_by_company(self, turn):
+        """Returns {company: total revenue} for a turn."""
+        totals = {}
+        for country, product, company_name, price, qty in self.rows(turn):
+            totals[company_name] = totals.get(company_name, 0) + price * qty
+        return totals
@@ -0,0 +1,226 @@
+"""Pre-generated market scenarios: bulk generation and a memory-mapped scenario bank.
+
+A scenario is the market side of a whole game: economic multiplier and event per turn,
+price center per (turn, product) and demand per (turn, product, country). generate_scenarios
+draws them for many games at once as arrays (same climate phases and ranges as
+MarketGenerator, but from NumPy streams, so a bank scenario is not the market of any seed).
+
+A bank is a directory of .npy arrays plus meta.json, written chunk by chunk so millions of
+scenarios never have to fit in memory. ScenarioBank opens the arrays memory-mapped: every
+worker process reads the same pages from the OS cache instead of regenerating markets.
+
+    python -m engine.scenario_bank write scenarios/ --count 1000000 --turns 20 --seed 0
+    python -m engine.scenario_bank info scenarios/
+    python -m engine.simulate --games 100000 --scenarios scenarios/
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from functools import lru_cache
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from engine.market_generator import COUNTRIES, MarketGenerator, build_turn_data
+
+EVENTS = ["Stability", "Growth", "Boom", "Dip", "Recession", "Recovery"]
+EVENT_INDEX = {event: i for i, event in enumerate(EVENTS)}
+
+# Scenarios drawn from one NumPy stream; scenario contents depend on (seed, CHUNK_SIZE)
+CHUNK_SIZE = 65536
+
+# name -> (dtype, shape after the scenario axis, given turns T, products P, countries C)
+ARRAYS = {
+    "multiplier": (np.float32, lambda t, p, c: (t,)),
+    "event": (np.uint8, lambda t, p, c: (t,)),
+    "price_center": (np.int32, lambda t, p, c: (t, p)),
+    "demand": (np.int32, lambda t, p, c: (t, p, c)),
+}
+
+
+def generate_climate(count, total_turns, rng):
+    """Returns (multiplier, event) arrays of shape (count, total_turns), see MarketGenerator._get_climate."""
+    turn = np.arange(1, total_turns + 1, dtype=np.float64)
+    growth_end = int(total_turns * 0.6)
+    crisis_end = int(total_turns * 0.8)
+    shape = (count, total_turns)
+
+    stability = turn <= 2
+    growth = (turn > 2) & (turn <= growth_end)
+    recession = (turn > growth_end) & (turn <= crisis_end)
+    recovery = turn > crisis_end
+
+    # Every draw is made for every cell; each phase uses its own
+    draw = rng.random(shape)
+    boom_factor = rng.uniform(1.05, 1.15, shape)
+    dip_factor = rng.uniform(0.92, 0.98, shape)
+    recession_level = rng.uniform(0.65, 0.85, shape)
+    recovery_factor = rng.uniform(0.98, 1.05, shape)
+
+    growth_base = 1.0 + (turn - 2) / max(growth_end - 2, 1) * 0.15
+    boom = growth & (draw < 0.3)
+    dip = growth & (draw >= 0.3) & (draw < 0.5)
+    recovery_base = 0.7 + (turn - crisis_end) / max(total_turns - crisis_end, 1) * 0.35
+
+    multiplier = np.select(
+        [np.broadcast_to(stability, shape), boom, dip, np.broadcast_to(growth, shape),
+         np.broadcast_to(recession, shape)],
+        [np.broadcast_to(1.0 + turn * 0.02, shape), growth_base * boom_factor, growth_base * dip_factor,
+         np.broadcast_to(growth_base, shape), recession_level],
+        default=recovery_base * recovery_factor)
+    event = np.select(
+        [np.broadcast_to(stability, shape), boom, dip, np.broadcast_to(growth, shape),
+         np.broadcast_to(recession, shape)],
+        [EVENT_INDEX["Stability"], EVENT_INDEX["Boom"], EVENT_INDEX["Dip"], EVENT_INDEX["Growth"],
+         EVENT_INDEX["Recession"]],
+        default=EVENT_INDEX["Recovery"]).astype(np.uint8)
+    return np.round(multiplier, 2), event
+
+
+def generate_scenarios(count, total_turns=20, rng=None, base_config=None):
+    """Generates count scenarios in one call. Returns {name: array} as described in ARRAYS,
+    products and countries in base_config order (MarketGenerator defaults if None).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    base_config = base_config or MarketGenerator(total_turns).base_config
+    products = base_config["products"]
+
+    multiplier, event = generate_climate(count, total_turns, rng)
+    base_price = np.array([info["base_price"] for info in products.values()], dtype=np.float64)
+    base_demand = np.array([[info["base_demand"][c] for c in COUNTRIES] for info in products.values()],
+                           dtype=np.float64)
+    noise = rng.uniform(0.95, 1.05, (count, total_turns, len(products), len(COUNTRIES)))
+
+    m = multiplier[:, :, None]
+    return {
+        "multiplier": multiplier.astype(np.float32),
+        "event": event,
+        "price_center": (base_price * m).astype(np.int32),
+        "demand": (base_demand * m[..., None] * noise).astype(np.int32),
+    }
+
+
+def write_bank(path, count, total_turns=20, seed=0, base_config=None, progress=None):
+    """Writes count scenarios to the bank directory path, CHUNK_SIZE scenarios at a time.
+    progress(written) is called after each chunk.
+    """
+    base_config = base_config or MarketGenerator(total_turns).base_config
+    products = list(base_config["products"])
+    os.makedirs(path, exist_ok=True)
+
+    arrays = {
+        name: open_memmap(os.path.join(path, f"{name}.npy"), mode="w+", dtype=dtype,
+                          shape=(count,) + shape(total_turns, len(products), len(COUNTRIES)))
+        for name, (dtype, shape) in ARRAYS.items()
+    }
+    for chunk, start in enumerate(range(0, count, CHUNK_SIZE)):
+        size = min(CHUNK_SIZE, count - start)
+        rng = np.random.default_rng([seed, chunk])
+        for name, values in generate_scenarios(size, total_turns, rng, base_config).items():
+            arrays[name][start:start + size] = values
+        if progress:
+            progress(start + size)
+    for array in arrays.values():
+        array.flush()
+    del arrays
+
+    # Written last: a bank without meta.json is incomplete
+    meta = {
+        "count": count,
+        "total_turns": total_turns,
+        "seed": seed,
+        "chunk_size": CHUNK_SIZE,
+        "products": products,
+        "countries": list(COUNTRIES),
+        "events": EVENTS,
+        "countries_config": base_config["countries"],
+    }
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=1)
+
+
+class ScenarioBank:
+    """Read-only, memory-mapped view of a bank written by write_bank."""
+    def __init__(self, path):
+        self.path = path
+        meta_path = os.path.join(path, "meta.json")
+        if not os.path.exists(meta_path):
+            raise ValueError(f"Not a complete scenario bank: {path}")
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.total_turns = self.meta["total_turns"]
+        self.products = self.meta["products"]
+        self.countries = self.meta["countries"]
+        self.events = self.meta["events"]
+        self.arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ARRAYS}
+
+    def __len__(self):
+        return self.meta["count"]
+
+    def scenario(self, index):
+        """Market of one scenario, usable in place of a MarketGenerator."""
+        if not 0 <= index < len(self):
+            raise IndexError(f"Scenario {index} out of range (bank has {len(self)})")
+        return ScenarioMarket(self, index)
+
+
+@lru_cache(maxsize=None)
+def open_bank(path):
+    """Opens a bank once per process (every game of a worker shares the same mapping)."""
+    return ScenarioBank(path)
+
+
+class ScenarioMarket:
+    """Turn data of one bank scenario, with the get_turn_data interface of MarketGenerator.
+    Reads the mapped arrays only (views, no copy of the bank).
+    """
+    def __init__(self, bank, index):
+        self.bank = bank
+        self.index = index
+        self.total_turns = bank.total_turns
+        self.base_config = {"countries": bank.meta["countries_config"]}
+
+    def get_turn_data(self, turn):
+        # Turns past the end (game over screen) repeat the last turn
+        t = min(max(turn, 1), self.total_turns) - 1
+        arrays = self.bank.arrays
+        centers = arrays["price_center"][self.index, t]
+        demand = arrays["demand"][self.index, t]
+        return build_turn_data(
+            float(arrays["multiplier"][self.index, t]),
+            self.bank.events[arrays["event"][self.index, t]],
+            {p: int(centers[j]) for j, p in enumerate(self.bank.products)},
+            {p: {c: int(demand[j, k]) for k, c in enumerate(self.bank.countries)}
+             for j, p in enumerate(self.bank.products)},
+            self.base_config["countries"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write or inspect a memory-mapped market scenario bank.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    write = sub.add_parser("write", help="generate a bank")
+    write.add_argument("path", help="bank directory")
+    write.add_argument("--count", type=int, default=100000, help="number of scenarios")
+    write.add_argument("--turns", type=int, default=20, help="total_turns of the games using the bank")
+    write.add_argument("--seed", type=int, default=0, help="seed of the bank")
+    info = sub.add_parser("info", help="describe a bank")
+    info.add_argument("path", help="bank directory")
+    args = parser.parse_args(argv)
+
+    if args.command == "write":
+        start = time.perf_counter()
+        write_bank(args.path, args.count, args.turns, args.seed,
+                   progress=lambda n: print(f"\r{n}/{args.count} scenarios", end="", file=sys.stderr))
+        print(f"\n{args.count} scenarios in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+    else:
+        bank = ScenarioBank(args.path)
+        size = sum(a.nbytes for a in bank.arrays.values())
+        print(f"{len(bank)} scenarios, {bank.total_turns} turns, seed {bank.meta['seed']}, {size / 2**20:.1f} MiB")
+        events = np.bincount(bank.arrays["event"][:CHUNK_SIZE].ravel(), minlength=len(bank.events))
+        print("events (first chunk): " + ", ".join(f"{e} {n}" for e, n in zip(bank.events, events)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Headless batch simulation: runs many AI-only games across all cores.
+
+Usage:
+    python -m engine.simulate --games 10000 --turns 20 --ais 10 --output games.csv
+    python -m engine.simulate --games 10000 --scenarios scenarios/    # markets from a scenario bank
+"""
+import argparse
+import csv
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from engine.world import World
+
+# Columns of the per-game summary file
+SUMMARY_FIELDS = [
+    "game", "seed", "total_turns", "num_ais",
+    "winner", "winner_personality", "winner_cash",
+    "mean_ai_cash", "min_ai_cash", "bankrupt_ais",
+    "units_sold", "revenue"
+]
+
+
+def play_game(seed, total_turns=20, num_ais=5, ai_cohorts=None, scenario=None):
+    """Plays one complete game with no player input and returns the finished World.
+    ai_cohorts: optional {personality: count} mix (overrides num_ais).
+    scenario: optional {"bank": path, "index": i} market (see engine/scenario_bank.py).
+    """
+    world = World(total_turns=total_turns, num_ais=num_ais, verbose=False, seed=seed, ai_cohorts=ai_cohorts,
+                  scenario=scenario)
+    while not world.is_game_over():
+        world.resolve_turn()
+    return world
+
+
+def summarize_game(world, game, seed):
+    """Builds the summary statistics of a finished game."""
+    ais = [c for c in world.companies if not c.is_player]
+    ranked = sorted(ais, key=lambda c: c.cash, reverse=True)
+    winner = ranked[0] if ranked else None
+
+    units_sold = 0
+    revenue = 0
+    for turn in world.sales_ledger.turns():
+        for _, _, _, price, qty in world.sales_ledger.rows(turn):
+            units_sold += qty
+            revenue += price * qty
+
+    ai_cash = [c.cash for c in ais]
+    return {
+        "game": game,
+        "seed": seed,
+        "total_turns": world.total_turns,
+        "num_ais": len(ais),
+        "winner": winner.name if winner else "",
+        "winner_personality": winner.ai_behavior.personality if winner else "",
+        "winner_cash": winner.cash if winner else 0,
+        "mean_ai_cash": round(sum(ai_cash) / len(ai_cash), 2) if ai_cash else 0,
+        "min_ai_cash": min(ai_cash) if ai_cash else 0,
+        "bankrupt_ais": sum(1 for cash in ai_cash if cash < 0),
+        "units_sold": units_sold,
+        "revenue": revenue
+    }
+
+
+def _run_one(job):
+    """Worker entry point: plays and summarizes one game."""
+    game, seed, total_turns, num_ais, scenario = job
+    world = play_game(seed, total_turns=total_turns, num_ais=num_ais, scenario=scenario)
+    return summarize_game(world, game, seed)
+
+
+def run_games(num_games, total_turns=20, num_ais=5, base_seed=0, workers=None, scenarios=None):
+    """Returns an iterator of one summary per game as games finish, spread over a process pool.
+    scenarios: optional scenario bank directory; game i plays scenario i (wrapping around).
+    Each worker maps the bank once and reads its scenarios in place.
+    Raises ValueError on an invalid or empty bank, before any game is played.
+    """
+    count = 0
+    if scenarios:
+        from engine.scenario_bank import open_bank
+        count = len(open_bank(scenarios))
+        if count == 0:
+            raise ValueError(f"Scenario bank has no scenarios: {scenarios}")
+    jobs = ((i, base_seed + i, total_turns, num_ais,
+             {"bank": scenarios, "index": i % count} if scenarios else None)
+            for i in range(num_games))
+    return _play_jobs(jobs, num_games, workers or os.cpu_count() or 1)
+
+
+def _play_jobs(jobs, num_games, workers):
+    if workers == 1:
+        for job in jobs:
+            yield _run_one(job)
+        return
+
+    # Large chunks keep inter-process overhead small for short games
+    chunksize = max(1, min(100, num_games // (workers * 4)))
+    with Pool(processes=workers) as pool:
+        for summary in pool.imap_unordered(_run_one, jobs, chunksize=chunksize):
+            yield summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run AI-only games without the web interface.")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--turns", type=int, default=20, help="total_turns of each game")
+    parser.add_argument("--ais", type=int, default=5, help="number of AI companies per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (game i uses seed + i)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--scenarios", default=None, help="scenario bank directory (default: seeded markets)")
+    parser.add_argument("--output", default="-", help="summary CSV file ('-' for stdout)")
+    args = parser.parse_args(argv)
+    try:
+        games = run_games(args.games, args.turns, args.ais, args.seed, args.workers, args.scenarios)
+    except ValueError as e:
+        parser.error(str(e))
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    writer = csv.DictWriter(out, fieldnames=SUMMARY_FIELDS)
+    writer.writeheader()
+
+    start = time.perf_counter()
+    wins = {}
+    for summary in games:
+        writer.writerow(summary)
+        if summary["winner_personality"]:
+            wins[summary["winner_personality"]] = wins.get(summary["winner_personality"], 0) + 1
+    elapsed = time.perf_counter() - start
+
+    if out is not sys.stdout:
+        out.close()
+
+    # Short report on stderr so it never mixes with CSV on stdout
+    print(f"{args.games} games in {elapsed:.1f}s ({args.games / max(elapsed, 1e-9):.0f} games/s)", file=sys.stderr)
+    for personality, count in sorted(wins.items(), key=lambda item: -item[1]):
+        print(f"  {personality}: {count} wins", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
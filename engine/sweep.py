@@ -0,0 +1,240 @@
+"""Parallel parameter sweep for economy balancing.
+
+Each point of a grid over balance constants is evaluated over the same seeded AI-only
+games, points are spread over a process pool, and finished points are memoized in a
+JSON Lines file so an interrupted or extended sweep never plays a point twice.
+
+Parameters (dotted paths):
+    setup_costs.<country>                    engine.world.SETUP_COSTS
+    country.<country>.<field>                entities.factory.COUNTRY_CONFIG (base_line_cost, maintenance_cost, ...)
+    product.<product>.base_price             MarketGenerator.base_config
+    demand.<product>.<country>               MarketGenerator.base_config base_demand
+
+Values: "start:stop:count" (evenly spaced) or "a,b,c".
+
+Usage:
+    python -m engine.sweep --param setup_costs.USA=30000:50000:5 --param country.China.maintenance_cost=80,100,120 \\
+        --games 50 --turns 20 --memo sweep_memo.jsonl --output sweep.csv
+"""
+import argparse
+import copy
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from engine import world as world_module
+from engine.market_generator import COUNTRIES, MarketGenerator
+from engine.simulate import summarize_game
+from engine.world import World
+from entities.factory import COUNTRY_CONFIG
+
+# Values restored before every point, so points never leak into each other
+_DEFAULT_SETUP_COSTS = dict(world_module.SETUP_COSTS)
+_DEFAULT_COUNTRY_CONFIG = copy.deepcopy(COUNTRY_CONFIG)
+# Products of the market generator, the only ones product.* and demand.* can name
+_PRODUCTS = list(MarketGenerator().base_config["products"])
+
+# Per-point results written to the table
+METRICS_FIELDS = [
+    "games", "mean_winner_cash", "mean_ai_cash", "min_ai_cash",
+    "bankrupt_rate", "top_personality", "top_personality_share", "mean_units_sold"
+]
+
+
+def parse_values(text):
+    """'start:stop:count' (evenly spaced, integers kept as integers) or 'a,b,c'."""
+    def number(s):
+        value = float(s)
+        return int(value) if value.is_integer() and "." not in s else value
+
+    if ":" in text:
+        start, stop, count = text.split(":")
+        start, stop, count = number(start), number(stop), int(count)
+        if count < 2:
+            return [start]
+        values = [start + (stop - start) * i / (count - 1) for i in range(count)]
+        if isinstance(start, int) and isinstance(stop, int):
+            values = [round(v) for v in values]
+        return values
+    return [number(v) for v in text.split(",")]
+
+
+def grid(params):
+    """Yields every point ({path: value}) of the cartesian product of {path: values}."""
+    paths = list(params)
+    for values in itertools.product(*(params[p] for p in paths)):
+        yield dict(zip(paths, values))
+
+
+def apply_point(point, world=None):
+    """Sets the balance constants of a point, everything else at its default.
+    Module constants are changed in place (this process only); with a world,
+    its market generator's base_config is updated too.
+    """
+    world_module.SETUP_COSTS.clear()
+    world_module.SETUP_COSTS.update(_DEFAULT_SETUP_COSTS)
+    for country, config in _DEFAULT_COUNTRY_CONFIG.items():
+        COUNTRY_CONFIG[country].update(config)
+
+    for path, value in point.items():
+        kind, *keys = path.split(".")
+        if kind == "setup_costs":
+            world_module.SETUP_COSTS[keys[0]] = value
+        elif kind == "country":
+            COUNTRY_CONFIG[keys[0]][keys[1]] = value
+        elif world is None:
+            continue
+        elif kind == "product":
+            world.parameters.generator.base_config["products"][keys[0]][keys[1]] = value
+        elif kind == "demand":
+            world.parameters.generator.base_config["products"][keys[0]]["base_demand"][keys[1]] = value
+        else:
+            raise ValueError(f"Unknown parameter: {path}")
+
+
+def check_path(path):
+    """Raises ValueError for a parameter path that does not name a balance constant."""
+    kind, *keys = path.split(".")
+    valid = {
+        "setup_costs": len(keys) == 1 and keys[0] in _DEFAULT_SETUP_COSTS,
+        "country": len(keys) == 2 and keys[0] in COUNTRY_CONFIG and keys[1] in COUNTRY_CONFIG[keys[0]],
+        "product": len(keys) == 2 and keys[0] in _PRODUCTS and keys[1] == "base_price",
+        "demand": len(keys) == 2 and keys[0] in _PRODUCTS and keys[1] in COUNTRIES,
+    }
+    if not valid.get(kind):
+        raise ValueError(f"Unknown parameter: {path}")
+
+
+def evaluate_point(job):
+    """Worker entry point: plays the point's games and aggregates their summaries."""
+    point, games, total_turns, num_ais, base_seed = job
+    summaries = []
+    for i in range(games):
+        apply_point(point)
+        world = World(total_turns=total_turns, num_ais=num_ais, verbose=False, seed=base_seed + i)
+        apply_point(point, world)
+        while not world.is_game_over():
+            world.resolve_turn()
+        summaries.append(summarize_game(world, i, base_seed + i))
+    apply_point({})
+
+    wins = {}
+    for s in summaries:
+        if s["winner_personality"]:
+            wins[s["winner_personality"]] = wins.get(s["winner_personality"], 0) + 1
+    top = max(wins, key=wins.get) if wins else ""
+    n = len(summaries)
+    return point, {
+        "games": n,
+        "mean_winner_cash": round(sum(s["winner_cash"] for s in summaries) / n, 2),
+        "mean_ai_cash": round(sum(s["mean_ai_cash"] for s in summaries) / n, 2),
+        "min_ai_cash": min(s["min_ai_cash"] for s in summaries),
+        "bankrupt_rate": round(sum(s["bankrupt_ais"] for s in summaries) / (n * max(num_ais, 1)), 4),
+        "top_personality": top,
+        "top_personality_share": round(wins.get(top, 0) / n, 4),
+        "mean_units_sold": round(sum(s["units_sold"] for s in summaries) / n, 2),
+    }
+
+
+def point_key(point, games, total_turns, num_ais, base_seed):
+    """Memo key: the point and everything else its result depends on."""
+    return json.dumps({"point": point, "games": games, "turns": total_turns,
+                       "ais": num_ais, "seed": base_seed}, sort_keys=True)
+
+
+def load_memo(path):
+    """Reads memoized results {key: metrics}; truncated lines (interrupted runs) are skipped."""
+    memo = {}
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                memo[record["key"]] = record["metrics"]
+    return memo
+
+
+def run_sweep(params, games=20, total_turns=20, num_ais=5, base_seed=0, workers=None, memo_path=None):
+    """Yields (point, metrics, cached) for every grid point; new results are appended to memo_path."""
+    for path in params:
+        check_path(path)
+    memo = load_memo(memo_path)
+    todo = []
+    for point in grid(params):
+        key = point_key(point, games, total_turns, num_ais, base_seed)
+        if key in memo:
+            yield point, memo[key], True
+        else:
+            todo.append((point, games, total_turns, num_ais, base_seed))
+
+    workers = workers or os.cpu_count() or 1
+    pool = Pool(processes=workers) if workers > 1 and todo else None
+    memo_file = open(memo_path, "a", encoding="utf-8") if memo_path else None
+    try:
+        results = pool.imap_unordered(evaluate_point, todo) if pool else map(evaluate_point, todo)
+        for point, metrics in results:
+            if memo_file:
+                key = point_key(point, games, total_turns, num_ais, base_seed)
+                memo_file.write(json.dumps({"key": key, "metrics": metrics}) + "\n")
+                memo_file.flush()
+            yield point, metrics, False
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+        if memo_file:
+            memo_file.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a grid of balance constants over seeded AI-only games.")
+    parser.add_argument("--param", action="append", default=[], metavar="PATH=VALUES",
+                        help="parameter and values, e.g. setup_costs.USA=30000:50000:5 (repeatable)")
+    parser.add_argument("--games", type=int, default=20, help="games per point (same seeds for every point)")
+    parser.add_argument("--turns", type=int, default=20, help="total_turns of each game")
+    parser.add_argument("--ais", type=int, default=5, help="AI companies per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game of each point")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--memo", default="sweep_memo.jsonl", help="memo file of evaluated points ('' to disable)")
+    parser.add_argument("--output", default="-", help="result table CSV ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    params = {}
+    for spec in args.param:
+        path, _, values = spec.partition("=")
+        if not values:
+            parser.error(f"--param needs PATH=VALUES: {spec}")
+        params[path] = parse_values(values)
+    if not params:
+        parser.error("at least one --param is required")
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="")
+    writer = csv.DictWriter(out, fieldnames=list(params) + METRICS_FIELDS)
+    writer.writeheader()
+
+    total = 1
+    for values in params.values():
+        total *= len(values)
+    start = time.perf_counter()
+    done = cached = 0
+    try:
+        for point, metrics, from_memo in run_sweep(params, args.games, args.turns, args.ais, args.seed,
+                                                   args.workers, args.memo or None):
+            writer.writerow({**point, **metrics})
+            done += 1
+            cached += from_memo
+            print(f"\r{done}/{total} points ({cached} memoized)", end="", file=sys.stderr)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"\n{total} points in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
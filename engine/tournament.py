@@ -0,0 +1,217 @@
+"""Monte Carlo tournament of AI personalities.
+
+Plays AI-only games with a random personality mix and seed per game, over a process pool,
+and keeps running aggregates per personality (constant memory). Stops once every
+personality's win rate is known within the requested margin.
+
+Usage:
+    python -m engine.tournament --max-games 20000 --ais 5 --turns 20 --margin 0.01
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from statistics import NormalDist
+
+from engine.AI_manager import AIManager
+from engine.simulate import play_game
+
+PERSONALITIES = AIManager.PERSONALITIES
+
+
+def game_mix(base_seed, game, num_ais):
+    """Personality counts of a game's AIs, drawn from the game's own stream."""
+    rng = random.Random(f"{base_seed}:tournament:{game}")
+    mix = {}
+    for _ in range(num_ais):
+        personality = rng.choice(PERSONALITIES)
+        mix[personality] = mix.get(personality, 0) + 1
+    return mix
+
+
+def _play(job):
+    """Worker entry point: plays one game, returns [(personality, final cash, won)] per AI."""
+    game, seed, total_turns, mix = job
+    world = play_game(seed, total_turns=total_turns, ai_cohorts=mix)
+    ais = [c for c in world.companies if not c.is_player]
+    winner = max(ais, key=lambda c: c.cash)
+    return [(c.ai_behavior.personality, c.cash, c is winner) for c in ais]
+
+
+class PersonalityStats:
+    """Running aggregates of one personality's seats: wins, cash mean and variance (Welford)
+    and a fixed-size reservoir sample for cash quantiles.
+    """
+    def __init__(self, personality, reservoir_size=10000):
+        self.personality = personality
+        self.seats = 0
+        self.wins = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min_cash = None
+        self.max_cash = None
+        self.reservoir_size = reservoir_size
+        self.sample = []
+        self._rng = random.Random(f"reservoir:{personality}")
+
+    def add(self, cash, won):
+        self.seats += 1
+        self.wins += won
+        delta = cash - self.mean
+        self.mean += delta / self.seats
+        self._m2 += delta * (cash - self.mean)
+        self.min_cash = cash if self.min_cash is None else min(self.min_cash, cash)
+        self.max_cash = cash if self.max_cash is None else max(self.max_cash, cash)
+        if len(self.sample) < self.reservoir_size:
+            self.sample.append(cash)
+        else:
+            i = self._rng.randrange(self.seats)
+            if i < self.reservoir_size:
+                self.sample[i] = cash
+
+    @property
+    def win_rate(self):
+        return self.wins / self.seats if self.seats else 0.0
+
+    def win_rate_interval(self, z):
+        """Wilson score interval of the win rate."""
+        n = self.seats
+        if n == 0:
+            return 0.0, 1.0
+        p = self.win_rate
+        center = (p + z * z / (2 * n)) / (1 + z * z / n)
+        half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+        return max(0.0, center - half), min(1.0, center + half)
+
+    def cash_interval(self, z):
+        """Normal confidence interval of the mean final cash."""
+        if self.seats < 2:
+            return float("-inf"), float("inf")
+        half = z * math.sqrt(self._m2 / (self.seats - 1) / self.seats)
+        return self.mean - half, self.mean + half
+
+    def quantile(self, q):
+        if not self.sample:
+            return 0
+        ordered = sorted(self.sample)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def to_dict(self, z):
+        low, high = self.win_rate_interval(z)
+        cash_low, cash_high = self.cash_interval(z)
+        return {
+            "personality": self.personality,
+            "seats": self.seats,
+            "wins": self.wins,
+            "win_rate": round(self.win_rate, 4),
+            "win_rate_ci": [round(low, 4), round(high, 4)],
+            "mean_cash": round(self.mean, 2),
+            "mean_cash_ci": [round(cash_low, 2), round(cash_high, 2)],
+            "min_cash": self.min_cash,
+            "p10_cash": self.quantile(0.1),
+            "median_cash": self.quantile(0.5),
+            "p90_cash": self.quantile(0.9),
+            "max_cash": self.max_cash,
+        }
+
+
+def converged(stats, z, margin):
+    """True once every personality's win rate interval is at most +/- margin wide."""
+    for s in stats.values():
+        low, high = s.win_rate_interval(z)
+        if s.seats == 0 or (high - low) / 2 > margin:
+            return False
+    return True
+
+
+def run_tournament(max_games=10000, total_turns=20, num_ais=5, base_seed=0, workers=None,
+                   margin=0.01, confidence=0.95, min_games=500, batch=500, progress=None):
+    """Plays games in batches until the win rates converge or max_games were played.
+    Returns (games played, {personality: PersonalityStats}).
+    progress(games, stats) is called after each batch.
+    Results are added in game order whatever the workers, so the reservoir samples (and
+    the quantiles drawn from them) are the same for the same seed.
+    """
+    if num_ais < 1:
+        raise ValueError("A tournament game needs at least one AI")
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    stats = {p: PersonalityStats(p) for p in PERSONALITIES}
+    workers = workers or os.cpu_count() or 1
+    played = 0
+
+    pool = Pool(processes=workers) if workers > 1 else None
+    try:
+        while played < max_games:
+            size = min(batch, max_games - played)
+            jobs = [(game, base_seed + game, total_turns, game_mix(base_seed, game, num_ais))
+                    for game in range(played, played + size)]
+            if pool:
+                results = pool.imap(_play, jobs, chunksize=max(1, size // (workers * 4)))
+            else:
+                results = map(_play, jobs)
+            for seats in results:
+                for personality, cash, won in seats:
+                    stats[personality].add(cash, won)
+            played += size
+            if progress:
+                progress(played, stats)
+            if played >= min_games and converged(stats, z, margin):
+                break
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    return played, stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank AI personalities over many AI-only games.")
+    parser.add_argument("--max-games", type=int, default=10000, help="stop after this many games")
+    parser.add_argument("--min-games", type=int, default=500, help="games played before checking convergence")
+    parser.add_argument("--batch", type=int, default=500, help="games between convergence checks")
+    parser.add_argument("--turns", type=int, default=20, help="total_turns of each game")
+    parser.add_argument("--ais", type=int, default=5, help="AI companies per game (random personality mix)")
+    parser.add_argument("--seed", type=int, default=0, help="base seed (game i uses seed + i)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--margin", type=float, default=0.01, help="target win rate interval half-width")
+    parser.add_argument("--confidence", type=float, default=0.95, help="confidence level of the intervals")
+    parser.add_argument("--output", default=None, help="JSON report file")
+    args = parser.parse_args(argv)
+    if args.ais < 1:
+        parser.error("--ais must be at least 1 (every game is won by one of its AIs)")
+
+    def progress(games, stats):
+        rates = ", ".join(f"{p} {s.win_rate:.3f}" for p, s in stats.items())
+        print(f"{games} games: {rates}", file=sys.stderr)
+
+    start = time.perf_counter()
+    played, stats = run_tournament(args.max_games, args.turns, args.ais, args.seed, args.workers,
+                                   args.margin, args.confidence, args.min_games, args.batch, progress)
+    elapsed = time.perf_counter() - start
+    z = NormalDist().inv_cdf(0.5 + args.confidence / 2)
+    report = {
+        "games": played,
+        "converged": converged(stats, z, args.margin),
+        "seconds": round(elapsed, 1),
+        "confidence": args.confidence,
+        "personalities": sorted((s.to_dict(z) for s in stats.values()), key=lambda r: -r["win_rate"]),
+    }
+
+    print(f"{played} games in {elapsed:.1f}s ({'converged' if report['converged'] else 'not converged'}, "
+          f"{args.confidence:.0%} intervals)")
+    print(f"{'personality':<14}{'seats':>8}{'win rate':>10}{'interval':>18}{'mean cash':>14}{'p10':>12}{'median':>12}{'p90':>12}")
+    for row in report["personalities"]:
+        low, high = row["win_rate_ci"]
+        print(f"{row['personality']:<14}{row['seats']:>8}{row['win_rate']:>10.3f}{f'[{low:.3f}, {high:.3f}]':>18}"
+              f"{row['mean_cash']:>14,.0f}{row['p10_cash']:>12,}{row['median_cash']:>12,}{row['p90_cash']:>12,}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+
+
+if __name__ == "__main__":
+    main()
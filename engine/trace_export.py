@@ -0,0 +1,242 @@
+"""Streaming export of full game traces for offline analysis.
+
+Games are played one at a time and each turn's records are written as soon as the turn
+is resolved, so memory stays constant however many games a batch holds:
+    decision  company sales decision and lines per product
+    sale      one clearing result (seller, price, quantity) per market
+    kpi       the company's KPI record of the turn (engine/kpi_series.py)
+
+Output is JSON Lines (one stream, "type" field) or CSV (one stream per record type),
+optionally compressed (gzip, bz2, xz) and rotated once a file reaches --max-mb.
+Each worker process writes its own shard of games to its own files.
+
+Usage:
+    python -m engine.trace_export --games 10000 --turns 20 --output traces/ --format jsonl \\
+        --compress gzip --max-mb 100 --workers 8
+"""
+import argparse
+import bz2
+import csv
+import gzip
+import io
+import json
+import lzma
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+from engine.kpi_series import FIELD_NAMES as KPI_FIELDS
+from engine.world import World
+
+FORMATS = ["jsonl", "csv"]
+COMPRESSORS = {
+    None: (None, ""),
+    "gzip": (lambda raw: gzip.GzipFile(fileobj=raw, mode="wb"), ".gz"),
+    "bz2": (lambda raw: bz2.BZ2File(raw, mode="wb"), ".bz2"),
+    "xz": (lambda raw: lzma.LZMAFile(raw, mode="wb"), ".xz"),
+}
+
+# Columns of each record type (CSV header, JSON key order)
+RECORD_FIELDS = {
+    "decision": ["game", "turn", "company", "product", "country", "price", "lines"],
+    "sale": ["game", "turn", "country", "product", "company", "price", "quantity", "base_demand"],
+    "kpi": ["game", "company"] + KPI_FIELDS,
+}
+
+
+def turn_records(world, game, turn):
+    """Yields the records of a just resolved turn (as (type, values) in RECORD_FIELDS order)."""
+    products = list(world.parameters.get_turn(turn)["products_meta"])
+    for company in world.companies:
+        lines = {}
+        for (_, product), n in company.line_totals.lines.items():
+            lines[product] = lines.get(product, 0) + n
+        for product in products:
+            decision = company.get_decision(product)
+            yield "decision", (game, turn, company.name, product, decision.get("country", ""),
+                               decision.get("price", 0), lines.get(product, 0))
+    for country, product, company_name, price, qty in world.sales_ledger.rows(turn):
+        yield "sale", (game, turn, country, product, company_name, price, qty,
+                       world.sales_ledger.get_demand(turn, country, product))
+    for company in world.companies:
+        record = world.kpi_series.records(company.name, slice(turn, turn + 1))
+        if record:
+            yield "kpi", (game, company.name) + tuple(record[0])
+
+
+def game_trace(game, seed, total_turns=20, num_ais=5):
+    """Plays one AI-only game, yielding each turn's records as soon as the turn is resolved."""
+    world = World(total_turns=total_turns, num_ais=num_ais, verbose=False, seed=seed)
+    while not world.is_game_over():
+        turn = world.turn
+        world.resolve_turn()
+        yield from turn_records(world, game, turn)
+
+
+class _RotatingFile:
+    """Text stream split into numbered parts of at most max_bytes (on disk, after compression).
+    A part is only closed between records; header is repeated at the top of each part.
+    """
+    def __init__(self, base, extension, compress=None, max_bytes=None, header=None):
+        self.base = base
+        self.extension = extension
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.header = header
+        self.part = 0
+        self.paths = []
+        self._raw = None
+        self._out = None
+
+    def _open(self):
+        wrap, suffix = COMPRESSORS[self.compress]
+        path = f"{self.base}-{self.part:04d}{self.extension}{suffix}"
+        self.part += 1
+        self.paths.append(path)
+        self._raw = open(path, "wb")
+        binary = wrap(self._raw) if wrap else self._raw
+        self._out = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        if self.header:
+            self._out.write(self.header)
+
+    def write(self, text):
+        if self._out is None:
+            self._open()
+        self._out.write(text)
+        # The compressor flushes to disk in blocks, so the size is checked on what reached the file
+        if self.max_bytes and self._raw.tell() >= self.max_bytes:
+            self.close()
+
+    def close(self):
+        if self._out is not None:
+            self._out.close()
+            self._raw.close()  # compressors leave the file they wrap open
+            self._out = None
+            self._raw = None
+
+
+class TraceWriter:
+    """Writes trace records to rotating files named <prefix>[-<type>]-<part>.<ext>[.<compression>]."""
+    def __init__(self, prefix, fmt="jsonl", compress=None, max_bytes=None):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown trace format: {fmt}")
+        if compress not in COMPRESSORS:
+            raise ValueError(f"Unknown compression: {compress}")
+        self.prefix = prefix
+        self.fmt = fmt
+        self.compress = compress
+        self.max_bytes = max_bytes
+        self.records = 0
+        self._files = {}  # stream name -> _RotatingFile
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer, lineterminator="\n")
+
+    def _csv_line(self, values):
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        self._csv.writerow(values)
+        return self._buffer.getvalue()
+
+    def _file(self, kind):
+        stream = kind if self.fmt == "csv" else "trace"
+        sink = self._files.get(stream)
+        if sink is None:
+            if self.fmt == "csv":
+                sink = _RotatingFile(f"{self.prefix}-{kind}", ".csv", self.compress, self.max_bytes,
+                                     header=self._csv_line(RECORD_FIELDS[kind]))
+            else:
+                sink = _RotatingFile(self.prefix, ".jsonl", self.compress, self.max_bytes)
+            self._files[stream] = sink
+        return sink
+
+    def write(self, kind, values):
+        if self.fmt == "csv":
+            text = self._csv_line(values)
+        else:
+            text = json.dumps({"type": kind, **dict(zip(RECORD_FIELDS[kind], values))}) + "\n"
+        self._file(kind).write(text)
+        self.records += 1
+
+    def write_all(self, records):
+        """Consumes an iterable of (type, values), e.g. game_trace()."""
+        for kind, values in records:
+            self.write(kind, values)
+
+    @property
+    def paths(self):
+        return [path for sink in self._files.values() for path in sink.paths]
+
+    def close(self):
+        for sink in self._files.values():
+            sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def export_shard(job):
+    """Worker entry point: writes the traces of games [start, stop) to the shard's own files.
+    Returns (shard, games, records, paths).
+    """
+    shard, start, stop, total_turns, num_ais, base_seed, output_dir, fmt, compress, max_bytes = job
+    prefix = os.path.join(output_dir, f"shard{shard:03d}")
+    with TraceWriter(prefix, fmt, compress, max_bytes) as writer:
+        for game in range(start, stop):
+            writer.write_all(game_trace(game, base_seed + game, total_turns, num_ais))
+    return shard, stop - start, writer.records, writer.paths
+
+
+def export_games(num_games, output_dir, total_turns=20, num_ais=5, base_seed=0, fmt="jsonl",
+                 compress=None, max_bytes=None, workers=None, shards=None):
+    """Exports the traces of num_games games, split in shards written in parallel.
+    Yields (shard, games, records, paths) as shards finish.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    shards = max(1, min(shards or workers, num_games))
+    bounds = [num_games * k // shards for k in range(shards + 1)]
+    jobs = [(k, bounds[k], bounds[k + 1], total_turns, num_ais, base_seed, output_dir, fmt, compress, max_bytes)
+            for k in range(shards)]
+
+    if workers == 1:
+        for job in jobs:
+            yield export_shard(job)
+        return
+    with Pool(processes=min(workers, shards)) as pool:
+        yield from pool.imap_unordered(export_shard, jobs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export full traces of AI-only games.")
+    parser.add_argument("--games", type=int, default=100, help="number of games to play")
+    parser.add_argument("--turns", type=int, default=20, help="total_turns of each game")
+    parser.add_argument("--ais", type=int, default=5, help="number of AI companies per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game (game i uses seed + i)")
+    parser.add_argument("--output", default="traces", help="output directory")
+    parser.add_argument("--format", choices=FORMATS, default="jsonl")
+    parser.add_argument("--compress", choices=[c for c in COMPRESSORS if c], default=None)
+    parser.add_argument("--max-mb", type=float, default=None, help="rotate files at this size (MB on disk)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--shards", type=int, default=None, help="game shards, one file set each (default: workers)")
+    args = parser.parse_args(argv)
+
+    max_bytes = int(args.max_mb * 2**20) if args.max_mb else None
+    start = time.perf_counter()
+    games = records = files = 0
+    for shard, shard_games, shard_records, paths in export_games(
+            args.games, args.output, args.turns, args.ais, args.seed, args.format,
+            args.compress, max_bytes, args.workers, args.shards):
+        games += shard_games
+        records += shard_records
+        files += len(paths)
+        print(f"shard {shard}: {shard_games} games, {shard_records} records, {len(paths)} files", file=sys.stderr)
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {records} records, {files} files in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
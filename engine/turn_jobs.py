@@ -0,0 +1,109 @@
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Phases reported while a turn resolves (see World.resolve_turn)
+PHASES = ["ai_actions", "production", "maintenance", "sales"]
+
+
+class TurnJob:
+    """One background turn resolution: status is "queued", "running", "done" or "failed"."""
+    def __init__(self, game_id, turn):
+        self.id = uuid.uuid4().hex
+        self.game_id = game_id
+        self.turn = turn
+        self.status = "queued"
+        self.phase = None
+        self.error = None
+        # Set once the result was announced to the player
+        self.reported = False
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+    def to_dict(self):
+        """Progress report sent to the browser."""
+        done = PHASES.index(self.phase) if self.phase in PHASES else 0
+        if self.status == "done":
+            done = len(PHASES)
+        return {
+            "job_id": self.id,
+            "turn": self.turn,
+            "status": self.status,
+            "phase": self.phase,
+            "progress": done / len(PHASES),
+            "error": self.error
+        }
+
+
+class TurnJobs:
+    """Resolves turns on a background thread pool, at most one job per (game, turn):
+    asking again for a turn that is queued, running or already resolved returns the same job.
+    """
+    def __init__(self, max_workers=2, max_jobs=1000):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="turn")
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()  # job id -> TurnJob, oldest first
+        self._by_turn = {}          # (game id, turn) -> TurnJob
+        self._lock = threading.Lock()
+
+    def submit(self, game_id, world, turn=None, open_world=None):
+        """Starts resolving a game's turn (the current one by default). Returns its TurnJob,
+        or None if that turn is not the current one and has no job (e.g. resolved before a restart).
+        open_world: returns a context manager giving exclusive access to the up-to-date World
+        (e.g. GameRegistry.locked); without it the job uses `world` directly.
+        """
+        turn = world.turn if turn is None else turn
+        with self._lock:
+            job = self._by_turn.get((game_id, turn))
+            if job is not None:
+                return job
+            if turn != world.turn:
+                return None
+            job = TurnJob(game_id, turn)
+            self._jobs[job.id] = job
+            self._by_turn[(game_id, turn)] = job
+            while len(self._jobs) > self.max_jobs:
+                _, old = self._jobs.popitem(last=False)
+                self._by_turn.pop((old.game_id, old.turn), None)
+        self._executor.submit(self._run, job, open_world or (lambda: nullcontext(world)))
+        return job
+
+    def _run(self, job, open_world):
+        job.status = "running"
+        try:
+            with open_world() as world:
+                if world.turn > job.turn:
+                    # Resolved meanwhile by another worker
+                    job.status = "done"
+                    return
+                if world.turn != job.turn:
+                    raise ValueError(f"Turn {job.turn} is not the current turn ({world.turn})")
+
+                def on_phase(phase):
+                    job.phase = phase
+                world.resolve_turn(on_phase=on_phase)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("Resolving turn %d of game %s failed", job.turn, job.game_id)
+            job.error = str(e)
+            job.status = "failed"
+
+    def get(self, job_id):
+        """Returns a job by id (None if unknown or forgotten)."""
+        return self._jobs.get(job_id)
+
+    def active(self, game_id):
+        """Returns the game's queued or running job, if any."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return next((j for j in reversed(jobs) if j.game_id == game_id and not j.finished), None)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,476 @@
+"""NumPy backend for the turn engine: World(backend="numpy").
+
+Company stock lives in arrays for the whole game: a StockTable holds the company x origin x
+product stock of every company, and each Company.inventory is a StockView of its row (same
+interface as entities.company.Inventory). Each turn, production, maintenance and sales run
+on one TurnArrays:
+  - stock:      the world's StockTable, updated in place
+  - cash:       company cash (int64, or float64 when any cash or cost is fractional)
+  - offers:     company x product price and target country
+Cash, costs and revenue are written back to the Company objects once, after the sales, so
+both backends share the same game state and the rest of the game (UI, snapshots, AIs) is
+unchanged.
+
+    python -m engine.vector_engine --seeds 20    # parity check against the Python backend
+"""
+import argparse
+
+import numpy as np
+
+from entities.factory import COUNTRY_CONFIG
+
+COUNTRIES = list(COUNTRY_CONFIG.keys())
+COUNTRY_INDEX = {country: i for i, country in enumerate(COUNTRIES)}
+
+
+def _money_dtype(*columns):
+    """int64 while every value is an int, so write-back gives the Python backend's exact values."""
+    return np.int64 if all(type(v) is int for values in columns for v in values) else np.float64
+
+
+class StockTable:
+    """Stock of a world's companies: qty[company, origin, product], with present marking the
+    entries an Inventory would hold (even at zero). Built from the companies' inventories,
+    which it then replaces with StockViews.
+    """
+    def __init__(self, companies, products=()):
+        self.companies = companies
+        self.products = list(products)
+        self.origins = list(COUNTRIES)
+        self.product_index = {p: j for j, p in enumerate(self.products)}
+        self.origin_index = dict(COUNTRY_INDEX)
+        self.qty = self.present = None
+        entries = []
+        for i, company in enumerate(companies):
+            for product in [p for (_, p) in company.line_totals.lines]:
+                self.product(product)
+            for product, by_origin in company.inventory.by_origin.items():
+                j = self.product(product)
+                for origin, qty in by_origin.items():
+                    entries.append((i, self.origin(origin), j, qty))
+        shape = (len(companies), len(self.origins), len(self.products))
+        self.qty = np.zeros(shape, dtype=np.int64)
+        self.present = np.zeros(shape, dtype=bool)
+        if entries:
+            i, k, j, qty = (np.array(column) for column in zip(*entries))
+            self.qty[i, k, j] = qty
+            self.present[i, k, j] = True
+        self._totals = None
+        for i, company in enumerate(companies):
+            company.inventory = StockView(self, i)
+
+    def product(self, product):
+        """Column of a product, added if new."""
+        j = self.product_index.get(product)
+        if j is None:
+            j = self.product_index[product] = len(self.products)
+            self.products.append(product)
+            if self.qty is not None:
+                self._grow()
+        return j
+
+    def origin(self, origin):
+        """Row of an origin (stock is only ever made in COUNTRIES)."""
+        k = self.origin_index.get(origin)
+        if k is None:
+            raise ValueError(f"Unknown origin: {origin}")
+        return k
+
+    def _grow(self):
+        """Adds a product column."""
+        pad = [(0, 0), (0, 0), (0, 1)]
+        self.qty = np.pad(self.qty, pad)
+        self.present = np.pad(self.present, pad)
+        self.changed()
+
+    def covers(self, companies):
+        """True if the table is still the stock of these companies (same list, still our views)."""
+        return (companies is self.companies and
+                all(type(c.inventory) is StockView and c.inventory.table is self for c in companies))
+
+    def changed(self):
+        self._totals = None
+
+    def totals(self):
+        """(per-product totals, present products) per company, as lists, computed once per change."""
+        if self._totals is None:
+            self._totals = (self.qty.sum(axis=1).tolist(), self.present.any(axis=1).tolist())
+        return self._totals
+
+
+class StockView:
+    """A company's row of a StockTable, with the interface of entities.company.Inventory."""
+    __slots__ = ("table", "i")
+
+    def __init__(self, table, i):
+        self.table = table
+        self.i = i
+
+    @property
+    def by_origin(self):
+        table = self.table
+        qty = table.qty[self.i].tolist()
+        present = table.present[self.i].tolist()
+        by_origin = {}
+        for j, product in enumerate(table.products):
+            origins = {origin: qty[k][j] for k, origin in enumerate(table.origins) if present[k][j]}
+            if origins:
+                by_origin[product] = origins
+        return by_origin
+
+    @property
+    def totals(self):
+        totals, present = self.table.totals()
+        row, has = totals[self.i], present[self.i]
+        return {product: row[j] for j, product in enumerate(self.table.products) if has[j]}
+
+    def add(self, origin, product, qty):
+        table = self.table
+        k, j = table.origin(origin), table.product(product)
+        table.qty[self.i, k, j] += qty
+        table.present[self.i, k, j] = True
+        table.changed()
+
+    def take(self, product, qty, origins):
+        table = self.table
+        j = table.product_index.get(product)
+        taken = []
+        if j is None:
+            return taken
+        for origin in list(origins) + [o for o in table.origins if o not in origins]:
+            if qty <= 0:
+                break
+            k = table.origin_index.get(origin)
+            available = 0 if k is None else int(table.qty[self.i, k, j])
+            if available > 0:
+                n = min(available, qty)
+                table.qty[self.i, k, j] -= n
+                qty -= n
+                taken.append((origin, n))
+        table.changed()
+        return taken
+
+
+class TurnArrays:
+    """Dense state of a world for one turn's production, maintenance and sales. Stock is the
+    world's StockTable (rebuilt only when it no longer covers the companies); the rest is
+    gathered in one pass over the companies and written back by write_back.
+    """
+    def __init__(self, world):
+        self.world = world  # prices are whole currency units (see World.update_sales)
+        companies = self.companies = world.companies
+        self.turn_products = list(world.get_turn_data()["products_meta"].keys())
+
+        stock = world._stock_table
+        if stock is None or not stock.covers(companies):
+            stock = world._stock_table = StockTable(companies, self.turn_products)
+        for product in self.turn_products:
+            stock.product(product)
+        try:
+            outputs = self._outputs(stock)
+        except KeyError:
+            # Lines of a product the table has no column for yet
+            for company in companies:
+                for product in [p for (_, p) in company.line_totals.lines]:
+                    stock.product(product)
+            outputs = self._outputs(stock)
+        self.stock = stock
+        self.outputs = np.array(outputs, dtype=np.int64).reshape(-1, 4)
+
+        self.maintenance = [company.line_totals.total_maintenance for company in companies]
+        cash = [company.cash for company in companies]
+        self.cash = np.array(cash, dtype=_money_dtype(cash, self.maintenance))
+        n = len(companies)
+        self.revenue = np.zeros(n, dtype=np.int64)
+        self.transport = np.zeros(n, dtype=np.int64)
+        self.taxes = np.zeros(n, dtype=np.int64)
+        self.paid = self.sold = False
+
+    def _outputs(self, stock):
+        """Line outputs as (company, country, product, units) index rows."""
+        product_index, origin_index = stock.product_index, stock.origin_index
+        return [(i, origin_index[country], product_index[product], units)
+                for i, company in enumerate(self.companies)
+                for (country, product), units in company.line_totals.output.items()]
+
+    def produce(self):
+        """Adds every line's output to stock, by country of origin."""
+        if len(self.outputs):
+            i, k, j, units = self.outputs.T
+            # One output per (company, country, product); an entry even when nothing was made
+            self.stock.qty[i, k, j] += units
+            self.stock.present[i, k, j] = True
+            self.stock.changed()
+
+    def pay_maintenance(self):
+        """Deducts each company's maintenance (its LineTotals rollup, as in the Python backend)."""
+        self.cash -= np.array(self.maintenance, dtype=self.cash.dtype)
+        self.paid = True
+
+    def sell(self):
+        """Lowest price wins, every (country, product) market cleared with array operations.
+        Returns {"offers": offers considered, "units_cleared": units sold}.
+        """
+        world = self.world
+        params = world.get_turn_data()
+        landed = world.get_landed_costs()
+        companies = self.companies
+        offers = 0
+        units_cleared = 0
+
+        demand = np.zeros((len(COUNTRIES), len(self.turn_products)), dtype=np.int64)
+        for country, country_data in params["countries"].items():
+            if country in COUNTRY_INDEX:
+                for j, product in enumerate(self.turn_products):
+                    demand[COUNTRY_INDEX[country], j] = country_data["products"].get(product, {}).get("base_demand", 0)
+
+        for t, product in enumerate(self.turn_products):
+            decisions = [company.get_decision(product) for company in companies]
+            prices = np.array([decision.get("price", 0) for decision in decisions], dtype=np.int64)
+            targets = np.array([COUNTRY_INDEX.get(decision.get("country", ""), -1) for decision in decisions],
+                               dtype=np.int64)
+            stocks = self.stock.qty[:, :, self.stock.product_index[product]].sum(axis=1)
+
+            valid = (targets >= 0) & (prices > 0) & (stocks > 0)
+            valid[valid] = demand[targets[valid], t] > 0
+
+            # Markets in order of their first seller, like the Python backend
+            market_targets = targets[valid]
+            if not len(market_targets):
+                continue
+            _, first = np.unique(market_targets, return_index=True)
+            sold = np.zeros(len(companies), dtype=np.int64)
+            for k in market_targets[np.sort(first)].tolist():
+                base_demand = int(demand[k, t])
+                sellers = np.flatnonzero(valid & (targets == k))
+
+                market_sold = clear_market(prices[sellers], stocks[sellers], base_demand, world.tie_split)
+                sold[sellers] = market_sold
+                offers += len(sellers)
+                units_cleared += int(market_sold.sum())
+
+                # Ledger rows in clearing order (price, then seller order), like the Python backend
+                order = np.lexsort((sellers, prices[sellers]))
+                order = order[market_sold[order] > 0]
+                world.sales_ledger.record_many(
+                    world.turn, COUNTRIES[k], product, [companies[i].name for i in sellers[order].tolist()],
+                    prices[sellers[order]].tolist(), market_sold[order].tolist(), base_demand)
+
+            # Every market of the product shipped and paid at once
+            sellers = np.flatnonzero(sold)
+            transport, taxes = self._ship(landed, sellers, sold[sellers], targets[sellers], product)
+            revenue = sold[sellers] * prices[sellers]
+            self.cash[sellers] += revenue - transport - taxes
+            self.revenue[sellers] += revenue
+            self.transport[sellers] += transport
+            self.taxes[sellers] += taxes
+
+        self.stock.changed()
+        self.sold = True
+        return {"offers": offers, "units_cleared": units_cleared}
+
+    def _ship(self, landed, sellers, sold, destinations, product):
+        """Vectorized LandedCosts.ship: takes each seller's units sold from stock, cheapest origins
+        for its destination (a COUNTRIES index) first. Returns rounded (transport, taxes) per seller.
+        """
+        stock = self.stock
+        j = stock.product_index[product]
+        # Origin tried at each rank, and unit costs, per destination
+        ranks = np.empty((len(COUNTRIES), len(stock.origins)), dtype=np.int64)
+        unit_transport = np.zeros((len(stock.origins), len(COUNTRIES)))
+        unit_taxes = np.zeros((len(stock.origins), len(COUNTRIES)))
+        for c, destination in enumerate(COUNTRIES):
+            ordered = list(landed.origins.get((destination, product), ()))
+            ordered += [origin for origin in stock.origins if origin not in ordered]
+            ranks[c] = [stock.origin_index[origin] for origin in ordered]
+            for k, origin in enumerate(stock.origins):
+                unit = landed.unit.get((origin, destination, product))
+                if unit is None:
+                    # As in LandedCosts.ship: nothing ships free
+                    raise ValueError(f"No landed cost from {origin} to {destination} for {product}")
+                unit_transport[k, c], unit_taxes[k, c] = unit
+
+        remaining = sold.copy()
+        transport = np.zeros(len(sellers))
+        taxes = np.zeros(len(sellers))
+        for rank in range(len(stock.origins)):
+            origins = ranks[destinations, rank]
+            taken = np.minimum(stock.qty[sellers, origins, j], remaining)
+            stock.qty[sellers, origins, j] -= taken
+            remaining -= taken
+            transport += taken * unit_transport[origins, destinations]
+            taxes += taken * unit_taxes[origins, destinations]
+        return np.round(transport).astype(np.int64), np.round(taxes).astype(np.int64)
+
+    def write_back(self):
+        """Stores cash, costs and revenue in the Company objects (stock is already in place)."""
+        companies = self.companies
+        if self.paid or self.sold:
+            for company, cash in zip(companies, self.cash.tolist()):
+                company.cash = cash
+        if self.paid:
+            for company, maintenance in zip(companies, self.maintenance):
+                company.costs["maintenance"] = maintenance
+        if self.sold:
+            revenue, transport, taxes = self.revenue.tolist(), self.transport.tolist(), self.taxes.tolist()
+            for i in np.flatnonzero(self.revenue).tolist():
+                company = companies[i]
+                company.revenue += revenue[i]
+                company.costs["transport"] += transport[i]
+                company.costs["taxes"] += taxes[i]
+
+
+def turn_phases(world):
+    """(phase, run) of production, maintenance and sales on one TurnArrays, gathered as
+    production starts and written back once the sales are done.
+    """
+    state = {}
+
+    def production():
+        state["arrays"] = TurnArrays(world)
+        state["arrays"].produce()
+
+    def sales():
+        counters = state["arrays"].sell()
+        state["arrays"].write_back()
+        return counters
+
+    return [
+        ("production", production),
+        ("maintenance", lambda: state["arrays"].pay_maintenance()),
+        ("sales", sales),
+    ]
+
+
+# Single phases with their own gather and write-back (benchmarks, tests)
+
+def calculate_production(world):
+    """Adds every company's output to stock, by country of origin."""
+    arrays = TurnArrays(world)
+    arrays.produce()
+    arrays.write_back()
+
+
+def apply_maintenance_costs(world):
+    """Deducts each company's maintenance from its cash."""
+    arrays = TurnArrays(world)
+    arrays.pay_maintenance()
+    arrays.write_back()
+
+
+def resolve_sales(world):
+    """Clears every market. Returns {"offers": offers considered, "units_cleared": units sold}."""
+    arrays = TurnArrays(world)
+    counters = arrays.sell()
+    arrays.write_back()
+    return counters
+
+
+def split_round_robin(stocks, demand):
+    """Vectorized engine.clearing.split_round_robin for one tier (stocks in seller order)."""
+    if stocks.sum() <= demand:
+        return stocks.copy()
+    n = len(stocks)
+    ordered = np.sort(stocks)
+    # Units handed out once every seller reached level ordered[j]
+    served = np.cumsum(ordered) + ordered * (n - 1 - np.arange(n))
+    j = np.searchsorted(served, demand, side="right") - 1
+    if j < 0:
+        level = demand // n
+    else:
+        level = ordered[j] + (demand - served[j]) // (n - 1 - j)
+    quantities = np.minimum(stocks, level)
+    leftover = demand - quantities.sum()
+    # One more unit for the first sellers (in order) still holding stock
+    still_active = stocks > level
+    quantities += still_active & (np.cumsum(still_active) <= leftover)
+    return quantities
+
+
+def split_proportional(stocks, demand):
+    """Vectorized engine.clearing.split_proportional for one tier."""
+    total = stocks.sum()
+    if total <= demand:
+        return stocks.copy()
+    quantities, remainders = np.divmod(demand * stocks, total)
+    leftover = demand - quantities.sum()
+    # Largest remainders first, ties by seller order
+    order = np.lexsort((np.arange(len(stocks)), -remainders))
+    quantities[order[:leftover]] += 1
+    return quantities
+
+
+SPLITTERS = {
+    "round_robin": split_round_robin,
+    "proportional": split_proportional,
+}
+
+
+def clear_market(prices, stocks, demand, mode="round_robin"):
+    """Vectorized engine.clearing.clear_market. Arrays are in seller order.
+    Returns the quantity sold by each seller.
+    """
+    order = np.argsort(prices, kind="stable")
+    sorted_prices = prices[order]
+    sorted_stocks = stocks[order]
+    sold = np.zeros(len(prices), dtype=np.int64)
+
+    # Tier boundaries and the demand left when each tier is reached
+    starts = np.flatnonzero(np.concatenate(([True], sorted_prices[1:] != sorted_prices[:-1])))
+    tier_stock = np.add.reduceat(sorted_stocks, starts)
+    demand_before = demand - np.concatenate(([0], np.cumsum(tier_stock)[:-1]))
+
+    # Tiers entirely served sell all their stock; the first tier short of demand is split
+    full = tier_stock <= demand_before
+    marginal = np.flatnonzero(~full)
+    last_full = marginal[0] if len(marginal) else len(starts)
+    end_full = starts[last_full] if last_full < len(starts) else len(prices)
+    sold_sorted = np.zeros(len(prices), dtype=np.int64)
+    sold_sorted[:end_full] = sorted_stocks[:end_full]
+    if len(marginal) and demand_before[last_full] > 0:
+        start = starts[last_full]
+        end = starts[last_full + 1] if last_full + 1 < len(starts) else len(prices)
+        sold_sorted[start:end] = SPLITTERS[mode](sorted_stocks[start:end], int(demand_before[last_full]))
+
+    sold[order] = sold_sorted
+    return sold
+
+
+def check_parity(seeds, total_turns=20, num_ais=10, tie_split="round_robin"):
+    """Plays the same games with both backends. Returns the seeds whose results differ."""
+    from engine.world import World
+
+    mismatches = []
+    for seed in seeds:
+        results = []
+        for backend in ("python", "numpy"):
+            world = World(total_turns=total_turns, num_ais=num_ais, tie_split=tie_split,
+                          verbose=False, seed=seed, backend=backend)
+            while not world.is_game_over():
+                world.resolve_turn()
+            results.append((
+                [(c.name, c.cash, c.revenue, c.costs, c.inventory.by_origin) for c in world.companies],
+                world.sales_ledger.__getstate__()
+            ))
+        if results[0] != results[1]:
+            mismatches.append(seed)
+    return mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that the NumPy backend matches the Python backend.")
+    parser.add_argument("--seeds", type=int, default=20, help="number of games to compare")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--ais", type=int, default=10)
+    parser.add_argument("--tie-split", default="round_robin")
+    args = parser.parse_args(argv)
+
+    mismatches = check_parity(range(args.seeds), args.turns, args.ais, args.tie_split)
+    if mismatches:
+        print(f"MISMATCH for seeds: {mismatches}")
+        raise SystemExit(1)
+    print(f"{args.seeds} games: numpy and python backends agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,19 @@
-﻿from engine.parameters import Parameters
+﻿import logging
+import random
+import time
+
+from engine.parameters import Parameters
 from entities.company import Company
-from entities.factory import Factories, COUNTRY_CONFIG
 from engine.AI_manager import AIManager
+from engine.clearing import clear_market, LandedCosts, TIE_SPLIT_MODES
+from engine.sales_ledger import SalesLedger
+from engine.kpi_series import KpiSeries
+from engine.action_log import ActionLog
+from engine import snapshot
+from engine.metrics import (TURN_PHASE_SECONDS, TURNS_RESOLVED, AI_ACTIONS,
+                            OFFERS_CONSIDERED, UNITS_CLEARED)
+
+logger = logging.getLogger(__name__)
 
 # Initial cost to build a factory in each country
 SETUP_COSTS = {
@@ -10,22 +22,98 @@ SETUP_COSTS = {
     "France": 30000
 }
 
+# Available turn engines (see World backend option)
+BACKENDS = ["python", "numpy"]
+
+
+def _line_fields(country, product):
+    """Company fields (see Company.mark_changed) affected by a change of lines."""
+    return [("lines", country, product), ("production", country, product),
+            ("capacity_used", country), ("maintenance", country),
+            ("product_output", product), ("total_maintenance",), ("cash",)]
+
+
 class World:
     """Main game engine coordinating turn-by-turn simulation with production, sales, and AI actions."""
-    def __init__(self, total_turns=20, num_ais=5):
-        self.parameters = Parameters(total_turns=total_turns)
+    def __init__(self, total_turns=20, num_ais=5, tie_split="round_robin", verbose=True,
+                 seed=None, player_name="Player", checkpoints=False, backend="python",
+                 ai_cohorts=None, scenario=None):
+        # Every random stream of the game (market, AIs) is derived from this seed
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        # Market from a scenario bank ({"bank": path, "index": i}, engine/scenario_bank.py) instead of the seed
+        self.scenario = scenario
+        self.parameters = Parameters(total_turns=total_turns, seed=seed,
+                                     generator=self._scenario_market(scenario, total_turns))
         self.turn = 1
         self.total_turns = total_turns 
-        self.ai_manager = AIManager(num_ais=num_ais)
+        self.ai_cohorts = ai_cohorts
+        self.ai_manager = AIManager(num_ais=num_ais, seed=seed, cohorts=ai_cohorts)
+        # Sales, KPIs and rankings identify companies by name
+        if player_name in self.ai_manager.ais:
+            raise ValueError(f"{player_name} is the name of an AI company")
+        self.player_name = player_name
         self.companies = self._initialize_companies()
-        self.sales_history = []
+        self.sales_ledger = SalesLedger()
+        # Per-turn KPIs of every company, recorded at the end of each turn
+        self.kpi_series = KpiSeries()
+        # How tied sellers share a price tier: "round_robin" or "proportional"
+        if tie_split not in TIE_SPLIT_MODES:
+            raise ValueError(f"Unknown tie split mode: {tie_split}")
+        self.tie_split = tie_split
+        # Turn engine: "python" (object loops) or "numpy" (engine/vector_engine.py)
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.backend = backend
+        if backend == "numpy":
+            from engine import vector_engine
+            self._vector_engine = vector_engine
+            # Stock of every company in arrays (vector_engine.StockTable), built on the first turn
+            self._stock_table = None
+        # Per-turn log lines (turned off for headless batch runs)
+        self.verbose = verbose
+        # Timings (seconds) and counters of the last resolved turn
+        self.last_turn_stats = {}
+        # Player actions, replayable with engine.action_log.replay
+        self.action_log = ActionLog(self.config)
+        # (turn, LandedCosts) of the last turn that shipped goods
+        self._landed_costs = None
+        # Snapshot taken at the start of each turn (engine/snapshot.py), if enabled
+        self.keep_checkpoints = checkpoints
+        self.checkpoints = {}
+    
+    @property
+    def config(self):
+        """Settings needed to recreate this game from scratch."""
+        return {
+            "seed": self.seed,
+            "total_turns": self.total_turns,
+            "num_ais": self.ai_manager.num_ais,
+            "ai_cohorts": self.ai_cohorts,
+            "tie_split": self.tie_split,
+            "player_name": self.player_name,
+            "backend": self.backend,
+            "scenario": self.scenario
+        }
+
+    @staticmethod
+    def _scenario_market(scenario, total_turns):
+        """Market of a bank scenario (None: the seeded MarketGenerator)."""
+        if scenario is None:
+            return None
+        from engine.scenario_bank import open_bank
+        bank = open_bank(scenario["bank"])
+        if bank.total_turns != total_turns:
+            raise ValueError(f"Scenario bank is for {bank.total_turns}-turn games, not {total_turns}")
+        return bank.scenario(scenario["index"])
     
     def _initialize_companies(self):
         """Creates the player and AI companies."""
         companies = []
         
         # Human player
-        player = Company("Player", is_player=True)
+        player = Company(self.player_name, is_player=True)
         companies.append(player)
         
         # AI companies
@@ -38,76 +126,94 @@ class World:
     def get_turn_data(self):
         """Returns parameters for the current turn."""
         return self.parameters.get_turn(self.turn)
+
+    def get_landed_costs(self):
+        """Landed cost table of the current turn (see engine/clearing.py), built once per turn."""
+        if self._landed_costs is None or self._landed_costs[0] != self.turn:
+            self._landed_costs = (self.turn, LandedCosts(self.get_turn_data()))
+        return self._landed_costs[1]
+    
+    def _cohort_members(self):
+        """Yields (cohort, member companies) for every non-empty AI cohort."""
+        ai_companies = {c.name: c for c in self.companies if not c.is_player}
+        for cohort in self.ai_manager.cohorts.values():
+            if cohort.names:
+                yield cohort, [ai_companies[name] for name in cohort.names]
     
     def _apply_ai_actions(self):
-        """Executes AI company actions for the current turn."""
+        """Executes AI company actions for the current turn, one personality cohort at a time.
+        Returns {"ai_actions": count}.
+        """
         turn_data = self.get_turn_data()
+        self.ai_manager.start_turn(self.turn)
+        products = [p for p in ["A", "B", "C"] if p in turn_data["products_meta"]]
+        actions = 0
         
-        for company in self.companies:
-            if company.is_player:
-                continue  # Player acts via frontend
-            
-            ai = company.ai_behavior
-            
+        for cohort, members in self._cohort_members():
             # 1. Buy a factory
-            if ai.should_buy_factory(self.turn):
-                country = ai.choose_country_for_factory()
+            for company, country in zip(members, cohort.factory_purchases(self.turn)):
+                if country is None:
+                    continue
                 cost = SETUP_COSTS[country]
                 
                 if company.cash >= cost:
                     company.cash -= cost
-                    new_factory = Factories(country, COUNTRY_CONFIG)
-                    if country not in company.factories:
-                        company.factories[country] = []
-                    company.factories[country].append(new_factory)
+                    company.add_factory(country)
+                    actions += 1
             
-            # 2. Allocate production lines
-            if company.factories:
-                lines = ai.allocate_lines_by_country(company.factories)
-                for country, products in lines.items():
-                    if country in company.factories:
-                        for product, qty in products.items():
-                            company.set_production_lines(country, product, qty)
+            # 2. Allocate production lines (same allocation in every country for the cohort).
+            # Members already running it (every turn but those of a new factory) cost one
+            # comparison per product; only lines that actually changed count as actions.
+            allocation = cohort.behavior.line_allocation()
+            targets = {country: [(product, (country, product), target) for product, target in allocation.items()]
+                       for country in SETUP_COSTS}
+            for company in members:
+                lines = company.line_totals.lines
+                for country in company.factories:
+                    for product, key, target in targets[country]:
+                        current = lines.get(key, 0)
+                        if current != target:
+                            company.set_production_lines(country, product, target)
+                            actions += lines.get(key, 0) != current
             
-            # 3. Set price and sales country
-            for product in ["A", "B", "C"]:
-                if product in turn_data["products_meta"]:
-                    prices = turn_data["products_meta"][product]["price_options"]
-                    chosen_price = ai.choose_price(prices)
-                    sales_country = ai.choose_sales_country(product)
-                    
-                    company.set_decision(product, "country", sales_country)
-                    company.set_decision(product, "price", chosen_price)
+            # 3. Set price and sales country (a member's decision is replaced whole)
+            prices = cohort.prices({p: turn_data["products_meta"][p] for p in products})
+            for product in products:
+                price = prices[product]
+                for company, sales_country in zip(members, cohort.sales_countries(product)):
+                    company.sales_decisions[product] = {"country": sales_country, "price": price}
+                actions += len(members)
+        
+        return {"ai_actions": actions}
     
     def _calculate_production(self):
-        """Calculates production and adds it to inventory."""
+        """Calculates production and adds it to inventory, by country of origin."""
         for company in self.companies:
-            for country, factories_list in company.factories.items():
-                efficiency = COUNTRY_CONFIG[country]["efficiency_multiplier"]
-                
-                for factory in factories_list:
-                    for product, lines in factory.product_lines.items():
-                        production = int(lines * 100 * efficiency)
-                        company.stock[product] = company.stock.get(product, 0) + production
+            # Output per (country, product) is maintained by the company's LineTotals
+            for (country, product), production in company.line_totals.output.items():
+                company.inventory.add(country, product, production)
     
     def _apply_maintenance_costs(self):
         """Deducts maintenance costs from all factories."""
         for company in self.companies:
-            total_maintenance = 0
-            for factories_list in company.factories.values():
-                for factory in factories_list:
-                    total_maintenance += factory.maintenance_cost
+            total_maintenance = company.line_totals.total_maintenance
             
             company.cash -= total_maintenance
             company.costs["maintenance"] = total_maintenance
     
     def _resolve_sales(self):
-        """Resolves sales based on lowest price wins logic."""
+        """Resolves sales based on lowest price wins logic.
+        Each price tier is cleared in one step (see engine/clearing.py); units sold are shipped
+        from the cheapest origins and pay their transport and taxes from the landed cost table.
+        Returns {"offers": offers considered, "units_cleared": units sold}.
+        """
         params = self.get_turn_data()
-        self.sales_history = []
+        landed = self.get_landed_costs()
+        offers = 0
+        units_cleared = 0
         
         for product in params["products_meta"].keys():
-            offers = []
+            offers_by_country = {}
             
             for company in self.companies:
                 decision = company.get_decision(product)
@@ -119,63 +225,28 @@ class World:
                     if country in params["countries"]:
                         base_demand = params["countries"][country]["products"].get(product, {}).get("base_demand", 0)
                         if base_demand > 0:
-                            offers.append({
-                                "company": company,
-                                "country": country,
-                                "price": price,
-                                "stock": stock,
-                                "base_demand": base_demand
-                            })
-            
-            if not offers:
-                continue
-            
-            offers_by_country = {}
-            for offer in offers:
-                country = offer["country"]
-                if country not in offers_by_country:
-                    offers_by_country[country] = []
-                offers_by_country[country].append(offer)
+                            if country not in offers_by_country:
+                                offers_by_country[country] = []
+                            offers_by_country[country].append((company, price, stock))
             
             for country, country_offers in offers_by_country.items():
-                base_demand = country_offers[0]["base_demand"]
-                country_offers.sort(key=lambda x: x["price"])
-                
-                remaining_demand = base_demand
+                base_demand = params["countries"][country]["products"][product]["base_demand"]
+                offers += len(country_offers)
                 
-                while remaining_demand > 0 and country_offers:
-                    min_price = country_offers[0]["price"]
-                    sellers_at_min_price = [o for o in country_offers if o["price"] == min_price]
-                    
-                    if not sellers_at_min_price:
-                        break
-                    
-                    for seller in sellers_at_min_price:
-                        if remaining_demand <= 0:
-                            break
-                        
-                        qty_to_sell = min(1, seller["stock"], remaining_demand)
-                        
-                        if qty_to_sell > 0:
-                            seller["company"].stock[product] -= qty_to_sell
-                            revenue = qty_to_sell * seller["price"]
-                            seller["company"].cash += revenue
-                            seller["company"].revenue += revenue
-                            
-                            self.sales_history.append({
-                                "country": country,
-                                "product": product,
-                                "company_name": seller["company"].name,
-                                "is_player": seller["company"].is_player,
-                                "price": seller["price"],
-                                "quantity": qty_to_sell,
-                                "base_demand": base_demand  # Store demand at time of sale
-                            })
-                            
-                            seller["stock"] -= qty_to_sell
-                            remaining_demand -= qty_to_sell
+                for company, price, qty_sold in clear_market(country_offers, base_demand, self.tie_split):
+                    units_cleared += qty_sold
+                    transport, taxes = landed.ship(company.inventory, product, country, qty_sold)
+                    revenue = qty_sold * price
+                    company.cash += revenue - transport - taxes
+                    company.revenue += revenue
+                    company.costs["transport"] += transport
+                    company.costs["taxes"] += taxes
                     
-                    country_offers = [o for o in country_offers if o["stock"] > 0]
+                    # Store demand at time of sale
+                    self.sales_ledger.record(self.turn, country, product, company.name,
+                                             price, qty_sold, base_demand)
+        
+        return {"offers": offers, "units_cleared": units_cleared}
     
     def get_ranking(self):
         """Returns company ranking by descending cash."""
@@ -183,31 +254,74 @@ class World:
         return [{"rank": i+1, "name": c.name, "cash": c.cash, "is_player": c.is_player} 
                 for i, c in enumerate(ranked)]
     
-    def resolve_turn(self):
-        """Fully resolves the current turn."""
-        print(f"--- RESOLVING TURN {self.turn} ---")
-        
-        # 1. Apply AI actions
-        self._apply_ai_actions()
-        
-        # 2. Calculate production
-        self._calculate_production()
+    def resolve_turn(self, on_phase=None):
+        """Fully resolves the current turn.
+        Each phase is timed; timings and counters go to last_turn_stats, the process
+        metrics (engine/metrics.py) and the log. on_phase(name) is called as each phase starts.
+        """
+        self.action_log.append(self.turn, "end_turn", {})
+        stats = {"turn": self.turn, "phases": {}, "ai_actions": 0, "offers": 0, "units_cleared": 0}
         
-        # 3. Apply maintenance costs
-        self._apply_maintenance_costs()
+        if self.backend == "numpy":
+            # 2-4. Same phases as whole-array operations on one gathered state
+            phases = [("ai_actions", self._apply_ai_actions)] + self._vector_engine.turn_phases(self)
+        else:
+            phases = [
+                # 1. Apply AI actions
+                ("ai_actions", self._apply_ai_actions),
+                # 2. Calculate production
+                ("production", self._calculate_production),
+                # 3. Apply maintenance costs
+                ("maintenance", self._apply_maintenance_costs),
+                # 4. Resolve sales
+                ("sales", self._resolve_sales),
+            ]
         
-        # 4. Resolve sales
-        self._resolve_sales()
+        for phase, run in phases:
+            if on_phase:
+                on_phase(phase)
+            start = time.perf_counter()
+            counters = run()
+            elapsed = time.perf_counter() - start
+            stats["phases"][phase] = elapsed
+            TURN_PHASE_SECONDS.observe(elapsed, phase=phase)
+            if counters:
+                stats.update(counters)
         
-        # 5. Reset and move to next turn
+        # 5. Record the turn's KPIs, reset and move to next turn
+        units_sold = {}
+        for _, _, company_name, _, qty in self.sales_ledger.rows(self.turn):
+            units_sold[company_name] = units_sold.get(company_name, 0) + qty
+        self.kpi_series.record_turn(self.turn, self.companies, units_sold)
         for company in self.companies:
             if hasattr(company, 'reset_all_past_inf'):
                 company.reset_all_past_inf()
+            company.mark_all_changed()
         
         self.turn += 1
         
-        print(f"Turn {self.turn - 1} resolved!")
-        print(f"Ranking: {self.get_ranking()}")
+        if self.keep_checkpoints:
+            start = time.perf_counter()
+            self.checkpoints[self.turn] = snapshot.dump(self)
+            stats["phases"]["checkpoint"] = time.perf_counter() - start
+            TURN_PHASE_SECONDS.observe(stats["phases"]["checkpoint"], phase="checkpoint")
+        
+        stats["seconds"] = sum(stats["phases"].values())
+        TURN_PHASE_SECONDS.observe(stats["seconds"], phase="total")
+        TURNS_RESOLVED.inc()
+        AI_ACTIONS.inc(stats["ai_actions"])
+        OFFERS_CONSIDERED.inc(stats["offers"])
+        UNITS_CLEARED.inc(stats["units_cleared"])
+        self.last_turn_stats = stats
+        
+        if self.verbose:
+            logger.info(
+                "Turn %d resolved in %.1f ms (%s) ai_actions=%d offers=%d units_cleared=%d",
+                stats["turn"], stats["seconds"] * 1000,
+                ", ".join(f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in stats["phases"].items()),
+                stats["ai_actions"], stats["offers"], stats["units_cleared"]
+            )
+            logger.debug("Ranking: %s", self.get_ranking())
     
     def is_game_over(self):
         """Checks if the game is finished."""
@@ -219,4 +333,181 @@ class World:
     
     def get_all_companies(self):
         """Returns all companies."""
-        return self.companies
\ No newline at end of file
+        return self.companies
+    
+    def get_player(self):
+        """Returns the human player's Company object."""
+        return next((c for c in self.companies if c.is_player), None)
+    
+    # Player actions (logged so the game can be replayed).
+    # An action is validated first and logged only once applied: a refused action changes nothing.
+
+    def _check_product(self, product):
+        if product not in self.get_turn_data()["products_meta"]:
+            raise ValueError(f"Unknown product: {product}")
+
+    def buy_factory(self, country):
+        """Player buys a factory in a country. Raises ValueError for an unknown country or insufficient funds."""
+        if country not in SETUP_COSTS:
+            raise ValueError(f"Unknown country: {country}")
+        player = self.get_player()
+        cost = SETUP_COSTS[country]
+        
+        if player.cash < cost:
+            raise ValueError("Insufficient funds.")
+        
+        player.cash -= cost
+        
+        player.add_factory(country)
+        player.mark_changed(("cash",), ("factories",))
+        self.action_log.append(self.turn, "buy_factory", {"country": country})
+    
+    def modify_lines(self, country, product, qty):
+        """Player adds (qty > 0) or removes (qty < 0) lines of a product across a country's factories.
+        Returns the operation cost. Raises ValueError when the change is refused.
+        """
+        self._check_product(product)
+        player = self.get_player()
+        if not player.factories.get(country):
+            raise ValueError("No factory found in this country")
+        cost = self._modify_lines(player, country, product, qty)
+        player.mark_changed(*_line_fields(country, product))
+        self.action_log.append(self.turn, "modify_lines", {"country": country, "product": product, "qty": qty})
+        return cost
+
+    def _modify_lines(self, player, country, product, qty):
+        """Applies modify_lines: changes lines, then checks and debits cash for this one change.
+        On refusal the factories' lines are put back as they were.
+        """
+        saved = [(f, dict(f.product_lines)) for f in player.factories[country]]
+        try:
+            cost = self._change_lines(player, country, product, qty)
+            if cost > 0 and player.cash < cost:
+                raise ValueError("Not enough cash")
+        except ValueError:
+            self._restore_lines(saved)
+            raise
+        player.cash -= cost
+        return cost
+
+    def modify_lines_batch(self, changes):
+        """Player applies several line changes at once: all of them or none.
+        changes: list of {"country", "product", "qty"} (delta) or {"country", "product", "value"} (absolute),
+        applied in order. Cash is checked once against the total cost.
+        Returns the total cost. Raises ValueError (with nothing changed) when any change is refused.
+        """
+        player = self.get_player()
+
+        # Line counts of the factories involved, restored if the batch fails
+        saved = []
+        for country in {change.get("country") for change in changes}:
+            for f in player.factories.get(country, []):
+                saved.append((f, dict(f.product_lines)))
+
+        cost = 0
+        try:
+            for change in changes:
+                country = change.get("country")
+                product = change.get("product")
+                self._check_product(product)
+                if not player.factories.get(country):
+                    raise ValueError(f"No factory found in {country}")
+                if "value" in change:
+                    desired = int(change["value"])
+                    if desired < 0:
+                        raise ValueError("Value cannot be negative")
+                    qty = desired - player.line_totals.get_lines(country, product)
+                else:
+                    qty = int(change.get("qty", 0))
+                cost += self._change_lines(player, country, product, qty)
+            if cost > 0 and player.cash < cost:
+                raise ValueError(f"Not enough cash (${cost} needed)")
+        except (ValueError, TypeError) as e:
+            self._restore_lines(saved)
+            raise ValueError(str(e)) from e
+
+        player.cash -= cost
+        player.mark_changed(*{field for change in changes
+                              for field in _line_fields(change["country"], change["product"])})
+        self.action_log.append(self.turn, "modify_lines_batch", {"changes": changes})
+        return cost
+
+    def _change_lines(self, player, country, product, qty):
+        """Adds or removes lines of a product across a country's factories, without touching cash.
+        Returns the cost (negative for a refund). Raises ValueError if the change does not fit.
+        """
+        factories_in_country = player.factories[country]
+        cost = 0
+        if qty > 0:
+            total_available = player.line_totals.free_space(country)
+            if qty > total_available:
+                raise ValueError(f"Max capacity reached in {country}! ({total_available} free, {qty} requested)")
+            remaining = qty
+            for f in factories_in_country:
+                if remaining <= 0:
+                    break
+                take = min(f.free_space, remaining)
+                if take > 0:
+                    cost += f.modify_lines(product, take)
+                    remaining -= take
+        elif qty < 0:
+            if -qty > player.line_totals.get_lines(country, product):
+                raise ValueError(f"No lines of {product} to remove in {country}.")
+            remaining = -qty
+            for f in factories_in_country:
+                if remaining <= 0:
+                    break
+                take = min(f.product_lines.get(product, 0), remaining)
+                if take > 0:
+                    cost += f.modify_lines(product, -take)
+                    remaining -= take
+        return cost
+
+    @staticmethod
+    def _restore_lines(saved):
+        """Puts factories back to saved line counts (removals first, so capacity is never exceeded)."""
+        changes = []
+        for f, product_lines in saved:
+            for product in set(f.product_lines) | set(product_lines):
+                diff = product_lines.get(product, 0) - f.product_lines.get(product, 0)
+                if diff:
+                    changes.append((diff, f, product))
+        for diff, f, product in sorted(changes, key=lambda c: c[0]):
+            f.modify_lines(product, diff)
+        # Products first seen in the batch go back to having no entry
+        for f, product_lines in saved:
+            for product in [p for p in f.product_lines if p not in product_lines]:
+                del f.product_lines[product]
+
+    def update_sales(self, product, field, value):
+        """Player records a sales decision (country or price) for a product.
+        Raises ValueError for an unknown product, field or country, or a price that is not an int.
+        """
+        self._check_product(product)
+        if field == "country":
+            if value != "" and value not in SETUP_COSTS:  # "" means not selling
+                raise ValueError(f"Unknown country: {value}")
+        elif field == "price":
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f"Invalid price: {value}")
+        else:
+            raise ValueError(f"Unknown sales field: {field}")
+        player = self.get_player()
+        player.set_decision(product, field, value)
+        player.mark_changed(("decision", product, field))
+        self.action_log.append(self.turn, "update_sales", {"product": product, "field": field, "value": value})
+    
+    def apply_action(self, action, args):
+        """Applies a logged action (see engine/action_log.py)."""
+        if action == "end_turn":
+            self.resolve_turn()
+        elif action == "buy_factory":
+            self.buy_factory(**args)
+        elif action == "modify_lines":
+            self.modify_lines(**args)
+        elif action == "modify_lines_batch":
+            self.modify_lines_batch(**args)
+        elif action == "update_sales":
+            self.update_sales(**args)
+        else:
+            raise ValueError(f"Unknown action: {action}")
@@ -1,3 +1,38 @@
+from entities.factory import Factories, LineTotals, COUNTRY_CONFIG
+
+
+class Inventory:
+    """Stock of a company by origin (the country where it was made), with per-product totals."""
+    __slots__ = ("by_origin", "totals")
+
+    def __init__(self):
+        self.by_origin = {}  # product -> {origin country: qty}
+        self.totals = {}     # product -> qty over all origins
+
+    def add(self, origin, product, qty):
+        origins = self.by_origin.setdefault(product, {})
+        origins[origin] = origins.get(origin, 0) + qty
+        self.totals[product] = self.totals.get(product, 0) + qty
+
+    def take(self, product, qty, origins):
+        """Removes qty units of a product, drawing from origins in the given order first.
+        Returns [(origin, qty)] of the units taken.
+        """
+        stock = self.by_origin.get(product, {})
+        taken = []
+        for origin in list(origins) + [o for o in stock if o not in origins]:
+            if qty <= 0:
+                break
+            available = stock.get(origin, 0)
+            if available > 0:
+                n = min(available, qty)
+                stock[origin] = available - n
+                qty -= n
+                taken.append((origin, n))
+        self.totals[product] = self.totals.get(product, 0) - sum(n for _, n in taken)
+        return taken
+
+
 class Company:
     """Represents a company (player or AI) with factories, inventory, and financial data."""
     def __init__(self, name, is_player=False, ai_behavior=None):
@@ -6,8 +41,9 @@ class Company:
         self.ai_behavior = ai_behavior
         self.cash = 100000
         self.profit = 0
-        self.factories = {}   # { "USA": [Factories, ...], ... }
-        self.stock = {}       # { "A": qty, ... }
+        self.factories = {}   # { "USA": [Factories, ...], ... } (add through add_factory)
+        self.line_totals = LineTotals()  # O(1) capacity, maintenance and production rollups
+        self.inventory = Inventory()  # stock by origin; self.stock gives the totals
         self.revenue = 0
 
         # Financial indicators (reset each turn)
@@ -16,6 +52,34 @@ class Company:
         # Sales decisions per product
         self.sales_decisions = {}
 
+        # State version, bumped by every change shown to the player (see mark_changed)
+        self.version = 0
+        self.full_version = 0     # version of the last change not tracked field by field
+        self.field_versions = {}  # field key, e.g. ("lines", country, product) -> version of its last change
+
+    @property
+    def stock(self):
+        """Units in stock per product, all origins together ({ "A": qty, ... })."""
+        return self.inventory.totals
+
+    def mark_changed(self, *fields):
+        """Bumps the version and records which fields changed."""
+        self.version += 1
+        for field in fields:
+            self.field_versions[field] = self.version
+
+    def mark_all_changed(self):
+        """Bumps the version after a change touching everything (e.g. a resolved turn)."""
+        self.version += 1
+        self.full_version = self.version
+        self.field_versions.clear()
+
+    def changed_since(self, version):
+        """Fields changed after a version, or None if everything must be resent."""
+        if version < self.full_version or version > self.version:
+            return None
+        return [field for field, v in self.field_versions.items() if v > version]
+
     def ensure_all_products(self, products):
         """Initializes stock entries for provided products."""
         for p in products:
@@ -46,7 +110,7 @@ class Company:
             return
 
         factories = self.factories[country]
-        current_total = sum(f.product_lines.get(product, 0) for f in factories)
+        current_total = self.line_totals.get_lines(country, product)
         diff = qty - current_total
 
         # Increase lines
@@ -92,15 +156,8 @@ class Company:
                 self.cash -= cost
                 remaining_to_remove -= to_remove
 
-    def buy_factory(self, country, cost=0, factory_obj=None):
-        """Adds a factory to the country. Deducts cost if provided.
-        Creates new Factories object if factory_obj not provided.
-        """
-        from entities.factory import Factories, COUNTRY_CONFIG
-
-        if cost and self.cash < cost:
-            raise ValueError("Not enough cash to buy factory")
-
+    def add_factory(self, country, factory_obj=None):
+        """Adds a factory to the country and to the line totals. Returns it."""
         if factory_obj is None:
             new_factory = Factories(country, COUNTRY_CONFIG)
         else:
@@ -109,6 +166,17 @@ class Company:
         if country not in self.factories:
             self.factories[country] = []
         self.factories[country].append(new_factory)
+        self.line_totals.add_factory(new_factory)
+        return new_factory
+
+    def buy_factory(self, country, cost=0, factory_obj=None):
+        """Adds a factory to the country. Deducts cost if provided.
+        Creates new Factories object if factory_obj not provided.
+        """
+        if cost and self.cash < cost:
+            raise ValueError("Not enough cash to buy factory")
+
+        self.add_factory(country, factory_obj)
 
         if cost:
             self.cash -= cost
\ No newline at end of file
@@ -1,5 +1,3 @@
-import uuid # Generate unique IDs
-
 # Configuration for each country: costs, efficiency, capacity, and maintenance
 COUNTRY_CONFIG = {
     "USA": {
@@ -24,20 +22,25 @@ COUNTRY_CONFIG = {
 
 
 
+def lines_output(lines, config):
+    """Units produced per turn by a factory running this many lines of a product."""
+    return int(lines * 100 * config["efficiency_multiplier"])
+
+
 class Factories:
     """Represents a production facility with capacity, efficiency, and maintenance costs."""
+    __slots__ = ("country", "config", "capacity", "product_lines", "total_lines_used", "totals")
+
     def __init__(self, country, config):
-        self.id = str(uuid.uuid4())[:8] # e.g., "a1b2c3d4"
         self.country = country
         self.config = config[country]
         self.capacity = self.config["max_capacity"]
         # Track lines per product: {'A': 5, 'B': 0}
         self.product_lines = {} 
-    
-    @property
-    def total_lines_used(self):
-        """Total number of production lines currently in use."""
-        return sum(self.product_lines.values())
+        # Total number of production lines currently in use (kept in sync by modify_lines)
+        self.total_lines_used = 0
+        # Owner's LineTotals, set when the factory is added to a company
+        self.totals = None
 
     @property
     def free_space(self):
@@ -60,6 +63,64 @@ class Factories:
             raise ValueError("Cannot have negative lines")
             
         self.product_lines[product] = current + qty
+        self.total_lines_used += qty
+        if self.totals is not None:
+            self.totals.lines_changed(self, product, current, current + qty)
 
         # Return operation cost (positive if buying, negative if selling/refunding)
-        return qty * self.config["base_line_cost"]
\ No newline at end of file
+        return qty * self.config["base_line_cost"]
+
+
+class LineTotals:
+    """Running totals of a company's factories, updated on every line change,
+    so capacity, maintenance and production figures are O(1) reads.
+    """
+    __slots__ = ("lines", "output", "product_output", "used", "capacity",
+                 "maintenance", "total_maintenance", "factory_count", "factory_counts")
+
+    def __init__(self):
+        self.lines = {}             # (country, product) -> lines
+        self.output = {}            # (country, product) -> units per turn
+        self.product_output = {}    # product -> units per turn
+        self.used = {}              # country -> lines used
+        self.capacity = {}          # country -> max lines
+        self.maintenance = {}       # country -> maintenance per turn
+        self.total_maintenance = 0
+        self.factory_count = 0
+        self.factory_counts = {}    # country -> number of factories
+
+    def add_factory(self, factory):
+        """Registers a new factory (and the lines it already runs)."""
+        country = factory.country
+        factory.totals = self
+        self.factory_count += 1
+        self.factory_counts[country] = self.factory_counts.get(country, 0) + 1
+        self.capacity[country] = self.capacity.get(country, 0) + factory.capacity
+        self.used.setdefault(country, 0)
+        self.maintenance.setdefault(country, 0)
+        for product, lines in factory.product_lines.items():
+            self.lines_changed(factory, product, 0, lines)
+
+    def lines_changed(self, factory, product, old, new):
+        """Applies one factory's change of lines for a product."""
+        country = factory.country
+        config = factory.config
+        key = (country, product)
+        delta = new - old
+        output_delta = lines_output(new, config) - lines_output(old, config)
+        maintenance_delta = delta * config["maintenance_cost"]
+
+        self.lines[key] = self.lines.get(key, 0) + delta
+        self.output[key] = self.output.get(key, 0) + output_delta
+        self.product_output[product] = self.product_output.get(product, 0) + output_delta
+        self.used[country] = self.used.get(country, 0) + delta
+        self.maintenance[country] = self.maintenance.get(country, 0) + maintenance_delta
+        self.total_maintenance += maintenance_delta
+
+    def get_lines(self, country, product):
+        """Lines of a product across a country's factories."""
+        return self.lines.get((country, product), 0)
+
+    def free_space(self, country):
+        """Unused line capacity across a country's factories."""
+        return self.capacity.get(country, 0) - self.used.get(country, 0)
@@ -1,66 +1,329 @@
-﻿from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from engine.world import World
-from entities.factory import Factories, COUNTRY_CONFIG
-
-app = Flask(__name__)
-app.secret_key = "super_secret_key" 
-TOTAL_TURNS = 2
-NUM_AIS = 5
-# Initialize game world with default settings
-world = World(total_turns=TOTAL_TURNS,num_ais=NUM_AIS)
-
-# Fixed factory setup costs by country
-SETUP_COSTS = {
-    "USA": 40000,
-    "China": 25000,
-    "France": 30000
-}
+﻿import hashlib
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+from functools import wraps
+
+from flask import (Flask, Blueprint, render_template, request, redirect, url_for, flash, jsonify, session, g,
+                   abort, Response, make_response, current_app)
+from jinja2 import FileSystemBytecodeCache
+from engine.game_registry import GameRegistry
+from engine.AI_manager import AIManager
+from engine.world import SETUP_COSTS
+from engine.metrics import METRICS
+from engine.turn_jobs import TurnJobs
+from engine.render_cache import RenderCache
+from engine.game_channels import GameChannels
+from entities.factory import COUNTRY_CONFIG
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Most AI opponents a player can choose on the start screen (create_app(max_ais=...) to change it)
+MAX_AIS = 50
+# Games kept in memory per worker, counted in Worlds rather than bytes (from about 150 KB with
+# 5 AIs to 650 KB with 50, late in a game); older ones are reloaded from the database on demand
+MAX_LOADED_GAMES = 500
+# Compiled templates, shared by every worker and kept across restarts
+TEMPLATE_CACHE_DIR = os.path.join(BASE_DIR, "cache", "jinja")
+# Fingerprinted static URLs (static_url) never change content, so browsers keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 3600
+# Routes still served while the session's turn is resolving
+TURN_SAFE_ENDPOINTS = {"game.index", "game.start_game", "game.end_turn", "game.turn_progress",
+                       "game.turn_status", "game.metrics", "game.events", "game.spectator_events",
+                       "game.spectate", "static"}
+
+# Request latency per route, exposed on /metrics
+REQUEST_SECONDS = METRICS.histogram(
+    "http_request_duration_seconds", "Flask request latency.", labels=("route", "method", "status"))
+
+bp = Blueprint("game", __name__)
+
+
+class GameServices:
+    """Game state shared by an app's requests: game registry, turn jobs and render cache.
+    Each is started on first use, so a parent process that forks workers (e.g. gunicorn --preload)
+    never opens the database or starts threads, which do not survive a fork.
+    """
+    def __init__(self, storage_dir, max_loaded_games=MAX_LOADED_GAMES):
+        self.storage_dir = storage_dir
+        self.max_loaded_games = max_loaded_games
+        self._lock = threading.Lock()
+        self._services = {}
+
+    def _get(self, name, build):
+        service = self._services.get(name)
+        if service is None:
+            with self._lock:
+                service = self._services.get(name)
+                if service is None:
+                    service = self._services[name] = build()
+        return service
+
+    @property
+    def games(self):
+        """One game per browser session."""
+        return self._get("games", lambda: GameRegistry(max_loaded=self.max_loaded_games,
+                                                       storage_dir=self.storage_dir))
+
+    @property
+    def turn_jobs(self):
+        """Turns are resolved in the background; pages poll the job until it is done."""
+        return self._get("turn_jobs", TurnJobs)
+
+    @property
+    def render_cache(self):
+        """Rendered pages and view data, keyed by (game, turn, state version)."""
+        return self._get("render_cache", RenderCache)
+
+    @property
+    def channels(self):
+        """Server-sent event channels of the games being watched."""
+        return self._get("channels", lambda: GameChannels(
+            self.games.version, lambda game_id: game_state(self.games, game_id)))
+
+
+class StaticFingerprints:
+    """URLs of static files with a content hash (?v=...), computed once per file and process."""
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        self._hashes = {}
+
+    def fingerprint(self, filename):
+        digest = self._hashes.get(filename)
+        if digest is None:
+            with open(os.path.join(self.static_folder, filename), "rb") as f:
+                digest = self._hashes[filename] = hashlib.sha256(f.read()).hexdigest()[:12]
+        return digest
+
+    def url(self, filename):
+        return url_for("static", filename=filename, v=self.fingerprint(filename))
+
+
+def game_state(registry, game_id):
+    """State pushed to a game's player and spectators (see engine/game_channels.py)."""
+    with registry.locked(game_id) as world:
+        if world is None:
+            return {"missing": True}
+        player = world.get_player()
+        totals = player.line_totals
+        return {
+            "turn": world.turn,
+            "total_turns": world.total_turns,
+            "game_over": world.is_game_over(),
+            "event": world.get_turn_data()["global"]["event"],
+            "player": player.name,
+            "cash": player.cash,
+            "factories": totals.factory_count,
+            "lines": {f"{country}-{product}": n for (country, product), n in totals.lines.items()},
+            "ranking": [[row["name"], row["cash"]] for row in world.get_ranking()],
+        }
+
+
+def services():
+    """The current app's GameServices."""
+    return current_app.extensions["business_game"]
+
+
+def precompile_templates(app):
+    """Compiles every template now (through the bytecode cache), instead of on the first request
+    of each worker. Forked workers inherit the compiled templates.
+    """
+    for name in app.jinja_env.list_templates(extensions=["html"]):
+        app.jinja_env.get_template(name)
+
+
+def create_app(storage_dir=None, max_loaded_games=MAX_LOADED_GAMES, template_cache_dir=TEMPLATE_CACHE_DIR,
+               precompile=True, max_ais=MAX_AIS):
+    """Builds the web app. Nothing game-related is created here: games, their database and the
+    turn workers start on the first request that needs them.
+    """
+    app = Flask(__name__)
+    app.secret_key = "super_secret_key"
+    app.config["MAX_AIS"] = max(0, int(max_ais))
+    if template_cache_dir:
+        os.makedirs(template_cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(template_cache_dir)
+    fingerprints = StaticFingerprints(app.static_folder)
+    app.jinja_env.globals["static_url"] = fingerprints.url
+    app.extensions["business_game"] = GameServices(storage_dir or os.path.join(BASE_DIR, "saved_games"),
+                                                   max_loaded_games)
+    app.register_blueprint(bp)
+    if precompile:
+        precompile_templates(app)
+    return app
+
+
+@bp.before_app_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@bp.after_app_request
+def record_request_time(response):
+    if "request_start" in g:
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        REQUEST_SECONDS.observe(time.perf_counter() - g.request_start,
+                                route=route, method=request.method, status=response.status_code)
+    return response
+
+@bp.after_app_request
+def cache_fingerprinted_static(response):
+    """Static files requested through static_url (with their fingerprint) are cached for STATIC_MAX_AGE."""
+    if request.endpoint == "static" and request.args.get("v") and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
+@bp.before_app_request
+def wait_for_turn_resolution():
+    """Keeps pages and actions off a game whose turn is resolving."""
+    if request.endpoint in TURN_SAFE_ENDPOINTS or not session.get("game_id"):
+        return None
+    job = services().turn_jobs.active(session["game_id"])
+    if job is None:
+        return None
+    if request.is_json:
+        return jsonify({'error': 'Turn is being resolved', 'job_id': job.id}), 409
+    return redirect(url_for(".turn_progress", job_id=job.id))
 
 # Helper functions
 
+def get_world():
+    """Returns the caller's World; games are only created by /start, so a session without one
+    (new, or whose game expired) is sent to the start page.
+    The game stays locked until the end of the request (see release_world).
+    """
+    if "world" not in g:
+        g.world_lock = ExitStack()
+        game_id = session.get("game_id")
+        world = g.world_lock.enter_context(services().games.locked(game_id)) if game_id else None
+        if world is None:
+            g.pop("world_lock").close()
+            session.pop("game_id", None)
+            if request.is_json:
+                abort(make_response(jsonify({'error': 'No game, start one first'}), 404))
+            abort(redirect(url_for(".index")))
+        g.world = world
+    return g.world
+
+@bp.teardown_app_request
+def release_world(exc):
+    """Stores the request's actions and unlocks its game."""
+    world_lock = g.pop("world_lock", None)
+    if world_lock is not None:
+        world_lock.close()
+        # Watchers of the game check it now instead of at their next poll
+        services().channels.notify(session.get("game_id"))
+
 def get_player():
     """Returns the human player's Company object."""
-    for c in world.companies:
-        if c.is_player:
-            return c
-    return None
+    return get_world().get_player()
 
 def get_sidebar_data(player):
-    """Returns common sidebar data (cash, turn, factories)."""
-    count = sum(len(factories) for factories in player.factories.values())
+    """Returns common sidebar data (cash, turn, factories) and the state version the page shows."""
     return {
-        "factory_count": count,
+        "factory_count": player.line_totals.factory_count,
         "player_cash": player.cash,
-        "current_turn": world.turn 
+        "current_turn": get_world().turn,
+        "state_version": player.version
     }
 
 def calculate_global_stats(player):
     """Calculates total maintenance and production by product."""
-    total_maint = 0
-    total_prod = {} 
-
-    for f_list in player.factories.values():
-        for f in f_list:
-            total_maint += f.maintenance_cost
-            
-            efficiency = f.config["efficiency_multiplier"]
-            for prod, lines in f.product_lines.items():
-                output = lines * 100 * efficiency
-                total_prod[prod] = total_prod.get(prod, 0) + int(output)
+    totals = player.line_totals
+    return totals.total_maintenance, dict(totals.product_output)
+
+# Company fields sent to the pages (see Company.mark_changed): kind -> (element id, current value)
+FIELD_VIEWS = {
+    "cash": lambda player: ("global-cash", player.cash),
+    "factories": lambda player: ("factory-count", player.line_totals.factory_count),
+    "total_maintenance": lambda player: ("header-total-maint", player.line_totals.total_maintenance),
+    "product_output": lambda player, product: (f"header-prod-{product}", player.line_totals.product_output.get(product, 0)),
+    "lines": lambda player, country, product: (f"lines-{country}-{product}", player.line_totals.get_lines(country, product)),
+    "production": lambda player, country, product: (f"prod-{country}-{product}", player.line_totals.output.get((country, product), 0)),
+    "capacity_used": lambda player, country: (f"cap-used-{country}", player.line_totals.used.get(country, 0)),
+    "maintenance": lambda player, country: (f"maint-{country}", player.line_totals.maintenance.get(country, 0)),
+    "decision": lambda player, product, field: (f"decision-{product}-{field}", player.get_decision(product).get(field)),
+}
 
-    return total_maint, total_prod
+def all_fields(player):
+    """Every field key of the player's state."""
+    totals = player.line_totals
+    fields = [("cash",), ("factories",), ("total_maintenance",)]
+    fields += [("product_output", product) for product in totals.product_output]
+    for country, product in totals.lines:
+        fields += [("lines", country, product), ("production", country, product)]
+    for country in totals.used:
+        fields += [("capacity_used", country), ("maintenance", country)]
+    for product, decision in player.sales_decisions.items():
+        fields += [("decision", product, field) for field in decision]
+    return fields
+
+def state_delta(player, since, **extra):
+    """JSON response with the player's fields changed after version `since` (all of them if
+    since is None or too old), keyed by element id, and the current version.
+    """
+    changed = player.changed_since(since) if since is not None else None
+    fields = all_fields(player) if changed is None else changed
+    return jsonify({
+        'version': player.version,
+        'full': changed is None,
+        'fields': dict(FIELD_VIEWS[field[0]](player, *field[1:]) for field in fields),
+        **extra
+    })
+
+def invalidate_views(turn_data=False):
+    """Drops the session game's cached pages after a change (and its turn data at the end of a turn)."""
+    if session.get('game_id'):
+        services().render_cache.invalidate(session['game_id'], turn_data=turn_data)
+
+def parse_since(data):
+    """Client state version from a JSON body (None if absent or invalid)."""
+    try:
+        return int(data['since'])
+    except (KeyError, ValueError, TypeError):
+        return None
+
+def conditional_view(view):
+    """Answers 304 Not Modified to a page whose state (game, turn, player version) did not change,
+    and otherwise serves it from the render cache.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        world = get_world()
+        game_id = session.get('game_id')
+        version = world.get_player().version
+        etag = f"{game_id}-{world.turn}-{version}"
+        # Flashed messages are part of the page, so it has to be rendered
+        if session.get('_flashes'):
+            response = make_response(view(*args, **kwargs))
+        elif etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            # Only rendered pages are kept, not redirects
+            response = make_response(services().render_cache.get(
+                game_id, (world.turn, version, request.endpoint),
+                lambda: view(*args, **kwargs), keep=lambda rv: isinstance(rv, str)))
+        if response.status_code not in (200, 304):
+            return response
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return wrapper
 
 # Display routes
 
 
-@app.route("/", methods=["GET"])
+@bp.route("/", methods=["GET"])
 def index():
     # Start page for game configuration
-    return render_template("start.html")
+    return render_template("start.html", max_ais=current_app.config["MAX_AIS"])
 
-@app.route("/start", methods=["POST"])
+@bp.route("/start", methods=["POST"])
 def start_game():
-    global world
     # Read form data and validate
     company_name = request.form.get("company_name", "Player").strip() or "Player"
     try:
@@ -76,25 +339,32 @@ def start_game():
     if total_turns < 1: total_turns = 1
     if total_turns > 50: total_turns = 50
     if num_ais < 0: num_ais = 0
-    if num_ais > 10: num_ais = 10
+    if num_ais > current_app.config["MAX_AIS"]: num_ais = current_app.config["MAX_AIS"]
 
-    # Reinitialize world with chosen configuration
-    world = World(total_turns=total_turns, num_ais=num_ais)
+    # Companies are identified by name
+    if AIManager.is_ai_name(company_name, num_ais):
+        flash(f"{company_name} is the name of an AI company, please choose another name.", "error")
+        return redirect(url_for(".index"))
 
-    # Update player name
-    player = get_player()
-    if player:
-        player.name = company_name
+    # Start a new game for this session with chosen configuration
+    if session.get("game_id"):
+        invalidate_views(turn_data=True)
+        services().games.discard(session["game_id"])
+    game_id = uuid.uuid4().hex
+    services().games.create(game_id, total_turns=total_turns, num_ais=num_ais, player_name=company_name)
+    session["game_id"] = game_id
 
     flash(f"Game started: {company_name} | turns={total_turns}, AI={num_ais}", "success")
-    return redirect(url_for("view_factories"))
+    return redirect(url_for(".view_factories"))
 
 
 
-@app.route("/factories")
+@bp.route("/factories")
+@conditional_view
 def view_factories():
+    world = get_world()
     if world.is_game_over():
-        return redirect(url_for("game_over"))
+        return redirect(url_for(".game_over"))
     player = get_player()
     return render_template(
         "factories.html",
@@ -104,10 +374,12 @@ def view_factories():
         **get_sidebar_data(player)
     )
 
-@app.route("/production")
+@bp.route("/production")
+@conditional_view
 def view_production():
+    world = get_world()
     if world.is_game_over():
-        return redirect(url_for("game_over"))
+        return redirect(url_for(".game_over"))
     player = get_player()
     global_maint, global_prod = calculate_global_stats(player)
     
@@ -116,12 +388,12 @@ def view_production():
     dynamic_products_list = list(current_params["products_meta"].keys())
 
     # Precompute production lines by country and product
+    totals = player.line_totals
     production_by_country = {}
-    for country, factories_list in player.factories.items():
+    for country in player.factories:
         production_by_country[country] = {}
         for product in dynamic_products_list:
-            total_lines = sum(f.product_lines.get(product, 0) for f in factories_list)
-            production_by_country[country][product] = total_lines
+            production_by_country[country][product] = totals.get_lines(country, product)
 
     return render_template(
         "production.html",
@@ -131,13 +403,16 @@ def view_production():
         global_maint=global_maint, 
         global_prod=global_prod,
         production_by_country=production_by_country,  # NOUVEAU
+        line_totals=totals,
         **get_sidebar_data(player)
     )
 
-@app.route('/market')
+@bp.route('/market')
+@conditional_view
 def market():
+    world = get_world()
     if world.is_game_over():
-        return redirect(url_for("game_over"))
+        return redirect(url_for(".game_over"))
     player = get_player()
     
     # Load current turn data
@@ -158,29 +433,25 @@ def market():
 
 # Action routes and AJAX endpoints
 
-@app.route("/buy_factory", methods=["POST"])
+@bp.route("/buy_factory", methods=["POST"])
 def buy_factory():
-    player = get_player()
+    world = get_world()
     country = request.form.get("country")
-    cost = SETUP_COSTS.get(country, 999999)
-
-    if player.cash < cost:
-        flash("Insufficient funds.", "error")
-        return redirect(url_for('view_factories'))
 
-    player.cash -= cost
-    
-    new_factory = Factories(country, COUNTRY_CONFIG)
-    if country not in player.factories:
-        player.factories[country] = [] 
-    player.factories[country].append(new_factory) 
+    try:
+        world.buy_factory(country)
+        invalidate_views()
+    except ValueError as e:
+        flash(str(e), "error")
+        return redirect(url_for('.view_factories'))
     
     flash(f"New factory established in {country}!", "success")
-    return redirect(url_for('view_factories'))
+    return redirect(url_for('.view_factories'))
 
-@app.route('/modify_lines_ajax', methods=['POST'])
+@bp.route('/modify_lines_ajax', methods=['POST'])
 def modify_lines_ajax():
     """Handles adding/removing production lines (delta or absolute mode)."""
+    world = get_world()
     player = get_player()
     if not player:
         return jsonify({'error': 'Game not initialized'}), 400
@@ -200,7 +471,7 @@ def modify_lines_ajax():
             desired = int(data.get('value', 0))
             if desired < 0:
                 return jsonify({'error': 'Value cannot be negative'}), 400
-            current_total = sum(f.product_lines.get(product, 0) for f in factories_in_country)
+            current_total = player.line_totals.get_lines(country, product)
             qty = desired - current_total
         else:
             # Delta mode (+/- buttons)
@@ -208,53 +479,20 @@ def modify_lines_ajax():
     except (ValueError, TypeError):
         return jsonify({'error': 'Invalid quantity'}), 400
 
-    cost = 0
     try:
-        if qty > 0:
-            # Distribute additions across all factories in the country
-            remaining = qty
-            total_available = sum(f.free_space for f in factories_in_country)
-            if remaining > total_available:
-                raise ValueError(f"Max capacity reached for this country! ({total_available} free, {remaining} requested)")
-            
-            for f in factories_in_country:
-                if remaining <= 0:
-                    break
-                take = min(f.free_space, remaining)
-                if take > 0:
-                    cost += f.modify_lines(product, take)
-                    remaining -= take
-        
-        elif qty < 0:
-            # Remove existing lines
-            remaining = -qty
-            for f in factories_in_country:
-                if remaining <= 0:
-                    break
-                have = f.product_lines.get(product, 0)
-                take = min(have, remaining)
-                if take > 0:
-                    cost += f.modify_lines(product, -take)
-                    remaining -= take
-            if remaining > 0:
-                raise ValueError("No lines to remove.")
-
-        # Verify sufficient cash
-        if cost > 0 and player.cash < cost:
-            # Rollback changes if insufficient funds
-            if qty > 0:
-                for f in factories_in_country:
-                    current = f.product_lines.get(product, 0)
-                    if current > 0:
-                        f.modify_lines(product, -current)
-            return jsonify({'error': 'Not enough cash'}), 400
-            
-        player.cash -= cost
-
-        country_lines = sum(f.product_lines.get(product, 0) for f in factories_in_country)
-        country_maintenance = sum(f.maintenance_cost for f in factories_in_country)
-        country_capacity_used = sum(f.total_lines_used for f in factories_in_country)
-        country_prod = int(country_lines * 100 * COUNTRY_CONFIG[country]["efficiency_multiplier"])
+        cost = world.modify_lines(country, product, qty)
+        invalidate_views()
+
+        # Clients sending their state version only get the fields that changed since
+        since = parse_since(data)
+        if since is not None:
+            return state_delta(player, since, last_op_cost=cost if qty > 0 else 0)
+
+        totals = player.line_totals
+        country_lines = totals.get_lines(country, product)
+        country_maintenance = totals.maintenance[country]
+        country_capacity_used = totals.used[country]
+        country_prod = totals.output.get((country, product), 0)
 
         global_maint, global_prod_dict = calculate_global_stats(player)
 
@@ -272,12 +510,50 @@ def modify_lines_ajax():
     except ValueError as e:
         return jsonify({'error': str(e)}), 400
     except Exception as e:
-        print(f"Error: {e}")
+        current_app.logger.exception("modify_lines_ajax failed: %s", e)
         return jsonify({'error': 'Server Error'}), 500
 
-@app.route('/update_sales_ajax', methods=['POST'])
+@bp.route('/modify_lines_batch_ajax', methods=['POST'])
+def modify_lines_batch_ajax():
+    """Applies a list of line changes in one transaction (all or none).
+    Body: {"changes": [{"country", "product", "qty"} or {"country", "product", "mode": "absolute", "value"}]}
+    """
+    world = get_world()
+    player = get_player()
+    if not player:
+        return jsonify({'error': 'Game not initialized'}), 400
+
+    data = request.json or {}
+    changes = []
+    try:
+        for change in data.get('changes', []):
+            entry = {'country': change['country'], 'product': change['product']}
+            if change.get('mode') == 'absolute':
+                entry['value'] = int(change.get('value', 0))
+            else:
+                entry['qty'] = int(change.get('qty'))
+            changes.append(entry)
+    except (KeyError, ValueError, TypeError):
+        return jsonify({'error': 'Invalid change'}), 400
+    if not changes:
+        return jsonify({'error': 'No changes'}), 400
+
+    try:
+        cost = world.modify_lines_batch(changes)
+        invalidate_views()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        current_app.logger.exception("modify_lines_batch_ajax failed: %s", e)
+        return jsonify({'error': 'Server Error'}), 500
+
+    # Fields changed since the client's version ("since"), or all of them
+    return state_delta(player, parse_since(data), last_op_cost=max(cost, 0))
+
+@bp.route('/update_sales_ajax', methods=['POST'])
 def update_sales_ajax():
     """Saves country and price choices for each product."""
+    world = get_world()
     player = get_player()
     if not player:
         return jsonify({'error': 'Player not found'}), 400
@@ -298,44 +574,31 @@ def update_sales_ajax():
         except (ValueError, TypeError):
             return jsonify({'error': 'Invalid price'}), 400
     
-    # Initialize structure if empty
-    if not hasattr(player, 'sales_decisions'):
-        player.sales_decisions = {}
-    
     # Update
-    player.set_decision(product, field, value)
+    try:
+        world.update_sales(product, field, value)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    invalidate_views()
 
+    since = parse_since(data)
+    if since is not None:
+        return state_delta(player, since, status='saved', value=value)
     return jsonify({'status': 'saved', 'value': value})
 
 # Overview page route
-@app.route("/overview")
+@bp.route("/overview")
+@conditional_view
 def view_overview():
+    world = get_world()
     if world.is_game_over():
-        return redirect(url_for("game_over"))
+        return redirect(url_for(".game_over"))
     player = get_player()
     ranking = world.get_ranking()
     
-    # Prepare sales matrix data
-    current_params = world.get_turn_data()
-    
-    # Aggregate sales by country, product, and company
-    sales_matrix = {}
-    for sale in world.sales_history:
-        key = (sale["country"], sale["product"])
-        if key not in sales_matrix:
-            # Use base_demand from the sale record (recorded at time of sale)
-            base_demand = sale.get("base_demand", 0)
-            sales_matrix[key] = {
-                "country": sale["country"],
-                "product": sale["product"],
-                "base_demand": base_demand,
-                "sales": {}
-            }
-        company_name = sale["company_name"]
-        sales_matrix[key]["sales"][company_name] = sales_matrix[key]["sales"].get(company_name, 0) + sale["quantity"]
-    
-    # Convert to list for template
-    sales_table = list(sales_matrix.values())
+    # Sales report of the last resolved turn, aggregated by the ledger
+    sales_table = services().render_cache.get(session.get('game_id'), (world.turn, "sales_table"),
+                                   lambda: world.sales_ledger.overview(world.turn - 1), turn_scoped=True)
     
     # Get all company names
     all_companies = [c.name for c in world.companies]
@@ -346,26 +609,124 @@ def view_overview():
         ranking=ranking,
         sales_table=sales_table,
         all_companies=all_companies,
+        spectator_token=services().games.spectator_token(session.get('game_id')),
         **get_sidebar_data(player)
     )
 
 # End turn action route
-@app.route("/end_turn", methods=["POST"])
+@bp.route("/end_turn", methods=["POST"])
 def end_turn():
-    # Execute turn resolution
-    world.resolve_turn()
-    if world.is_game_over():
-        return redirect(url_for("game_over"))
-    # Show success message
-    flash(f"Turn completed! Welcome to Turn {world.turn}.", "success")
-    
-    # Redirect to factories page for new turn
-    return redirect(url_for('view_factories'))
-
-@app.route("/gameover")
+    """Starts resolving the turn in the background and returns at once (202 with the job for JSON
+    clients, otherwise the progress page). Submitting the same turn again joins the running job.
+    """
+    world = get_world()
+    try:
+        turn = int(request.form.get("turn", world.turn))
+    except (ValueError, TypeError):
+        turn = world.turn
+    game_id = session["game_id"]
+    # The job runs outside the request, so it keeps the registry itself
+    registry = services().games
+    job = services().turn_jobs.submit(game_id, world, turn, open_world=lambda: registry.locked(game_id))
+    invalidate_views(turn_data=True)
+    if job is None:
+        # That turn was already resolved
+        return redirect(url_for('.view_factories'))
+    if request.is_json or request.accept_mimetypes.best == "application/json":
+        return jsonify(job.to_dict()), 202
+    return redirect(url_for(".turn_progress", job_id=job.id))
+
+def get_turn_job(job_id):
+    """Returns the session's turn job (None if unknown or another player's)."""
+    job = services().turn_jobs.get(job_id)
+    if job is None or job.game_id != session.get("game_id"):
+        return None
+    return job
+
+@bp.route("/turn/<job_id>")
+def turn_progress(job_id):
+    """Waiting page of a resolving turn; it polls turn_status and redirects when done."""
+    job = get_turn_job(job_id)
+    if job is None:
+        return redirect(url_for('.view_factories'))
+    return render_template("turn_progress.html", job=job)
+
+@bp.route("/turn/<job_id>/status")
+def turn_status(job_id):
+    """Progress of a turn job; once resolved, includes the page to go to next."""
+    job = get_turn_job(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    status = job.to_dict()
+    if job.status == "done":
+        world = get_world()
+        if world.is_game_over():
+            status['redirect'] = url_for(".game_over")
+        else:
+            status['redirect'] = url_for('.view_factories')
+            if not job.reported:
+                # Show success message on the next page
+                flash(f"Turn completed! Welcome to Turn {job.turn + 1}.", "success")
+        job.reported = True
+    return jsonify(status)
+
+@bp.route("/gameover")
+@conditional_view
 def game_over():
+    world = get_world()
     ranking = world.get_ranking()
     return render_template("game_over.html", ranking=ranking)
 
+def event_stream(game_id):
+    """Server-sent events of a game's channel; every subscriber shares the same encoded messages."""
+    channel = services().channels.channel(game_id)
+    response = Response(channel.subscribe(request.headers.get("Last-Event-ID")), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"  # no proxy buffering (nginx)
+    return response
+
+@bp.route("/events")
+def events():
+    """Live state of the session's game, for the player's pages."""
+    game_id = session.get("game_id")
+    if not game_id or game_id not in services().games:
+        return jsonify({'error': 'No game'}), 404
+    return event_stream(game_id)
+
+@bp.route("/watch/<token>")
+def spectate(token):
+    """Read-only live view of a game (e.g. projected by an instructor), found by its spectator token:
+    the session's game id never appears in a URL.
+    """
+    if services().games.spectated(token) is None:
+        return "Unknown game", 404
+    return render_template("spectate.html", token=token)
+
+@bp.route("/watch/<token>/events")
+def spectator_events(token):
+    """Server-sent events of a game for its spectators."""
+    game_id = services().games.spectated(token)
+    if game_id is None:
+        return jsonify({'error': 'Unknown game'}), 404
+    return event_stream(game_id)
+
+@bp.route("/kpi_history")
+def kpi_history():
+    """Per-turn KPIs of every company so far (engine/kpi_series.py), one list per field, for charts.
+    Optional ?start=&stop= restrict the turns (stop excluded).
+    """
+    world = get_world()
+    turns = slice(request.args.get("start", type=int), request.args.get("stop", type=int))
+    return jsonify({"turn": world.turn, "companies": world.kpi_series.to_dict(turns)})
+
+@bp.route("/metrics")
+def metrics():
+    """Prometheus text exposition of turn phase and route latencies."""
+    return Response(METRICS.render(), mimetype="text/plain; version=0.0.4")
+
+# Default app (`gunicorn main:app`, `python main.py`); cheap to build, see create_app
+app = create_app()
+
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     app.run(debug=True, port=5000)
\ No newline at end of file
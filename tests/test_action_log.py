@@ -0,0 +1,73 @@
+import pytest
+
+from engine import snapshot
+from engine.action_log import ActionLog, replay
+from engine.world import World
+
+
+def play_session(world):
+    """Player actions over two turns, including refused ones."""
+    refused = [
+        lambda: world.buy_factory("Atlantis"),
+        lambda: world.modify_lines("USA", "A", 5),           # no factory there
+        lambda: world.modify_lines("China", "Z", 5),         # unknown product
+        lambda: world.modify_lines("China", "B", 500),       # over capacity
+        lambda: world.modify_lines_batch([{"country": "China", "product": "A", "qty": 4},
+                                          {"country": "China", "product": "B", "qty": -3}]),
+        lambda: world.update_sales("A", "country", "Atlantis"),
+        lambda: world.update_sales("A", "colour", "red"),
+    ]
+    world.buy_factory("China")
+    world.modify_lines("China", "A", 6)
+    for action in refused:
+        with pytest.raises(ValueError):
+            action()
+    world.update_sales("A", "country", "USA")
+    world.update_sales("A", "price", world.get_turn_data()["products_meta"]["A"]["price_options"][0])
+    world.resolve_turn()
+    world.modify_lines_batch([{"country": "China", "product": "A", "qty": -2},
+                              {"country": "China", "product": "B", "value": 3}])
+    world.buy_factory("France")
+    with pytest.raises(ValueError):
+        world.modify_lines("France", "C", -1)
+    world.resolve_turn()
+
+
+def test_refused_actions_change_nothing_and_are_not_logged():
+    world = World(total_turns=3, num_ais=2, verbose=False, seed=3)
+    world.buy_factory("China")
+    world.modify_lines("China", "A", 5)
+    before = snapshot.dump(world)
+    log_length = len(world.action_log)
+
+    world.get_player().cash = 100
+    with pytest.raises(ValueError):
+        world.modify_lines("China", "A", 10)
+    with pytest.raises(ValueError):
+        world.buy_factory("Atlantis")
+    world.get_player().cash = snapshot.load(before).get_player().cash
+
+    assert len(world.action_log) == log_length
+    assert snapshot.dump(world) == before
+
+
+def test_replay_round_trip_with_refused_actions(tmp_path):
+    world = World(total_turns=4, num_ais=3, verbose=False, seed=11)
+    play_session(world)
+    assert all(entry["args"].get("country") != "Atlantis" for entry in world.action_log)
+
+    path = tmp_path / "game.jsonl"
+    world.action_log.save(path)
+    replayed = replay(ActionLog.load(path))
+    assert replayed.turn == world.turn == 3
+    assert snapshot.dump(replayed) == snapshot.dump(world)
+
+
+def test_replay_surfaces_an_action_that_fails():
+    world = World(total_turns=3, num_ais=1, verbose=False, seed=2)
+    world.buy_factory("China")
+    log = ActionLog.from_header({"config": world.config}, world.action_log.entries +
+                                [{"turn": 1, "action": "modify_lines",
+                                  "args": {"country": "USA", "product": "A", "qty": 3}}])
+    with pytest.raises(ValueError):
+        replay(log)
@@ -0,0 +1,70 @@
+from main import create_app
+
+
+def session_cookie(app, game_id):
+    return app.session_interface.get_signing_serializer(app).dumps({"game_id": game_id})
+
+
+def served(app, game_id, path="/factories", etag=None):
+    client = app.test_client()
+    client.set_cookie(app.config["SESSION_COOKIE_NAME"], session_cookie(app, game_id))
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(path, headers=headers)
+
+
+def play(app, game_id, turns):
+    with app.extensions["business_game"].games.locked(game_id) as world:
+        for _ in range(turns):
+            if not world.get_player().factories:
+                world.buy_factory("China")
+            world.modify_lines("China", "A", 1)
+            world.resolve_turn()
+
+
+def test_etags_agree_between_workers(tmp_path):
+    # Two workers sharing the game database, each with its own registry and caches
+    first = create_app(storage_dir=str(tmp_path), template_cache_dir=None)
+    second = create_app(storage_dir=str(tmp_path), template_cache_dir=None)
+    client = first.test_client()
+    client.post("/start", data={"company_name": "Me", "total_turns": "20", "num_ais": "2"})
+    game_id = first.session_interface.get_signing_serializer(first).loads(
+        client.get_cookie(first.config["SESSION_COOKIE_NAME"]).value)["game_id"]
+
+    play(first, game_id, 6)
+    etag = served(first, game_id).headers["ETag"]
+    assert served(second, game_id).headers["ETag"] == etag
+    assert served(second, game_id, etag=etag.strip('"')).status_code == 304
+
+    # A change made by the second worker is seen by the first: its old page is not served
+    play(second, game_id, 1)
+    changed = served(second, game_id).headers["ETag"]
+    assert changed != etag
+    assert served(first, game_id, etag=etag.strip('"')).status_code == 200
+    assert served(first, game_id).headers["ETag"] == changed
+
+
+def test_pages_without_a_game_do_not_create_one(tmp_path):
+    app = create_app(storage_dir=str(tmp_path), template_cache_dir=None)
+    client = app.test_client()
+    response = client.get("/factories")
+    assert response.status_code == 302 and response.headers["Location"].endswith("/")
+    assert client.post("/modify_lines_ajax", json={}).status_code == 404
+    # An expired game is no longer in the session either
+    assert served(app, "gone").status_code == 302
+    registry = app.extensions["business_game"].games
+    assert registry._connect().execute("SELECT COUNT(*) FROM games").fetchone() == (0,)
+
+
+def test_spectators_use_a_token_not_the_game_id(tmp_path):
+    app = create_app(storage_dir=str(tmp_path), template_cache_dir=None)
+    client = app.test_client()
+    client.post("/start", data={"company_name": "Me", "total_turns": "5", "num_ais": "1"})
+    game_id = app.session_interface.get_signing_serializer(app).loads(
+        client.get_cookie(app.config["SESSION_COOKIE_NAME"]).value)["game_id"]
+    token = app.extensions["business_game"].games.spectator_token(game_id)
+
+    overview = client.get("/overview").get_data(as_text=True)
+    assert f"/watch/{token}" in overview and game_id not in overview
+    assert client.get(f"/watch/{token}").status_code == 200
+    assert client.get(f"/watch/{game_id}").status_code == 404
+    assert app.test_client().get(f"/watch/{game_id}/events").status_code == 404
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from engine.clearing import LandedCosts, clear_market, split_proportional
+from engine.world import World
+from entities.company import Inventory
+
+
+def clear_unit_by_unit(offers, demand):
+    """Reference clearing: cheapest tier first, one unit per tied seller per round, in seller order."""
+    sold = {}
+    for price in sorted({price for _, price, _ in offers}):
+        tier = [[key, stock] for key, p, stock in offers if p == price]
+        while demand > 0 and any(stock for _, stock in tier):
+            for seller in tier:
+                if demand > 0 and seller[1] > 0:
+                    seller[1] -= 1
+                    demand -= 1
+                    sold[seller[0]] = sold.get(seller[0], 0) + 1
+    return sold
+
+
+def random_markets(count, seed=0):
+    rng = random.Random(seed)
+    for _ in range(count):
+        sellers = rng.randint(1, 8)
+        offers = [(i, rng.choice([90, 100, 110]), rng.randint(0, 60)) for i in range(sellers)]
+        yield offers, rng.randint(0, 300)
+
+
+def test_round_robin_matches_unit_by_unit():
+    for offers, demand in random_markets(500):
+        result = clear_market(offers, demand)
+        assert {key: qty for key, _, qty in result} == clear_unit_by_unit(offers, demand)
+        assert all(price == offers[key][1] for key, price, _ in result)
+
+
+def test_proportional_split_follows_stock():
+    assert split_proportional([30, 10], 20) == [15, 5]
+    assert split_proportional([1, 1, 1], 2) == [1, 1, 0]  # remainders tie: seller order
+    assert split_proportional([5, 7], 50) == [5, 7]
+    for offers, demand in random_markets(200, seed=1):
+        sold = sum(qty for _, _, qty in clear_market(offers, demand, "proportional"))
+        assert sold == min(demand, sum(stock for _, _, stock in offers))
+
+
+def test_unknown_tie_split():
+    with pytest.raises(ValueError):
+        clear_market([("a", 10, 5)], 3, "lottery")
+
+
+def test_stock_of_unknown_origin_does_not_ship_free():
+    world = World(total_turns=3, num_ais=0, verbose=False, seed=1)
+    landed = LandedCosts(world.get_turn_data())
+    inventory = Inventory()
+    inventory.add("China", "A", 5)
+    assert landed.ship(inventory, "A", "USA", 5) > (0, 0)
+    inventory.add("Atlantis", "A", 5)
+    with pytest.raises(ValueError):
+        landed.ship(inventory, "A", "USA", 5)
@@ -0,0 +1,92 @@
+import json
+
+from engine import snapshot
+from engine.action_log import ActionLog, replay
+from engine.game_registry import GameRegistry
+
+
+def play_turns(registry, game_id, turns):
+    for _ in range(turns):
+        with registry.locked(game_id) as world:
+            if world.turn == 1:
+                world.buy_factory("China")
+            world.modify_lines("China", "A", 1)
+            world.resolve_turn()
+
+
+def stored(registry, game_id, table, columns):
+    return registry._connect().execute(f"SELECT {columns} FROM {table} WHERE game_id = ?", (game_id,)).fetchall()
+
+
+def test_reload_replays_only_the_actions_after_the_snapshot(tmp_path):
+    registry = GameRegistry(storage_dir=str(tmp_path), snapshot_turns=3)
+    registry.create("g", total_turns=12, num_ais=2, seed=5)
+    play_turns(registry, "g", 7)
+
+    # Stored at turns 4 and 7, before the actions of turn 7
+    [(seq, turn)] = stored(registry, "g", "snapshots", "seq, turn")
+    total = len(stored(registry, "g", "actions", "seq"))
+    assert turn == 7 and total - seq == 2
+
+    # Another process: the game comes from the turn-7 snapshot, then the actions after it
+    other = GameRegistry(storage_dir=str(tmp_path), snapshot_turns=3)
+    with other.locked("g") as world:
+        assert world.turn == 8 and len(world.action_log) == total - seq
+        world.modify_lines("China", "B", 2)
+    play_turns(other, "g", 2)
+    play_turns(registry, "g", 1)
+
+    header, entries = stored(registry, "g", "games", "header")[0][0], stored(registry, "g", "actions", "entry")
+    full = replay(ActionLog.from_header(json.loads(header), [json.loads(e) for (e,) in entries]))
+    fresh = GameRegistry(storage_dir=str(tmp_path), snapshot_turns=3)
+    assert snapshot.dump(fresh.get("g")) == snapshot.dump(full) == snapshot.dump(registry.get("g"))
+    assert fresh.get("g").turn == 11
+
+
+def test_new_game_and_discard_drop_the_snapshot(tmp_path):
+    registry = GameRegistry(storage_dir=str(tmp_path), snapshot_turns=1)
+    registry.create("g", total_turns=5, num_ais=1, seed=1)
+    play_turns(registry, "g", 2)
+    assert stored(registry, "g", "snapshots", "turn") == [(3,)]
+
+    registry.create("g", total_turns=5, num_ais=1, seed=2)
+    assert stored(registry, "g", "snapshots", "turn") == []
+    assert registry.get("g").turn == 1
+
+    play_turns(registry, "g", 1)
+    registry.discard("g")
+    assert stored(registry, "g", "snapshots", "turn") == []
+    assert "g" not in registry
+
+
+def test_worker_behind_a_newer_snapshot_loads_it(tmp_path):
+    registry = GameRegistry(storage_dir=str(tmp_path))
+    registry.create("g", total_turns=6, num_ais=1, seed=3)
+    play_turns(registry, "g", 1)
+
+    other = GameRegistry(storage_dir=str(tmp_path))
+    play_turns(other, "g", 2)
+
+    # The turns resolved by the other worker are loaded, not resolved again
+    world = registry.get("g")
+    assert world.turn == 4 and len(world.action_log) == 0
+    assert snapshot.dump(world) == snapshot.dump(other.get("g"))
+
+
+def test_discard_drops_the_game_lock(tmp_path):
+    registry = GameRegistry(storage_dir=str(tmp_path))
+    registry.create("g", total_turns=5, num_ais=1, seed=1)
+    play_turns(registry, "g", 1)
+    registry.discard("g")
+    assert "g" not in registry._game_locks
+    assert not (tmp_path / "locks" / "g.lock").exists()
+
+
+def test_expire_discards_only_abandoned_games(tmp_path):
+    registry = GameRegistry(storage_dir=str(tmp_path))
+    registry.create("old", total_turns=5, num_ais=1, seed=1)
+    registry.create("new", total_turns=5, num_ais=1, seed=1)
+    with registry._connect() as conn:
+        conn.execute("UPDATE games SET updated = updated - 100 WHERE game_id = 'old'")
+    assert registry.expire(max_age=50) == ["old"]
+    assert "old" not in registry and "new" in registry
@@ -0,0 +1,58 @@
+import pickle
+
+import pytest
+
+from engine.AI_manager import AIManager
+from engine.kpi_series import FIELD_NAMES, RECORD, KpiSeries
+from engine.world import World
+from entities.company import Company
+from entities.factory import COUNTRY_CONFIG
+
+
+def play(world, turns):
+    for _ in range(turns):
+        world.resolve_turn()
+    return world
+
+
+def test_records_round_trip_through_packing():
+    company = Company("Acme", is_player=True)
+    company.cash = 1234.5
+    company.revenue = 99
+    company.costs["maintenance"] = 100.25
+    series = KpiSeries()
+    series.record_turn(1, [company], {"Acme": 30})
+    company.cash = 1000
+    series.record_turn(2, [company], {"Acme": 10, "Other": 30})
+
+    first, second = series.records("Acme")
+    assert first.turn == 1 and first.cash == 1234.5 and first.maintenance_cost == 100.25
+    assert first.units_sold == 30 and first.market_share == 1.0
+    assert second.market_share == 0.25
+    assert series.records("Acme", slice(2, 3)) == [second]
+    assert series.column("Acme", "cash") == [1234.5, 1000]
+    assert series.nbytes == 2 * RECORD.size
+    assert list(series.to_dict()["Acme"]) == FIELD_NAMES
+
+    restored = pickle.loads(pickle.dumps(series))
+    assert restored.records("Acme") == [first, second]
+
+
+def test_turn_with_fractional_cost(monkeypatch):
+    monkeypatch.setitem(COUNTRY_CONFIG["China"], "maintenance_cost", 100.3)
+    world = play(World(total_turns=3, num_ais=5, verbose=False, seed=7), 3)
+
+    assert len(world.kpi_series) == 3
+    for company in world.companies:
+        records = world.kpi_series.records(company.name)
+        assert [r.turn for r in records] == [1, 2, 3]
+        assert records[-1].cash == pytest.approx(company.cash)
+    assert any(r.maintenance_cost % 1 for c in world.companies for r in world.kpi_series.records(c.name))
+
+
+def test_player_cannot_take_an_ai_name():
+    assert AIManager.is_ai_name("AI_Alpha", 1)
+    assert not AIManager.is_ai_name("AI_Beta", 1)
+    assert AIManager.is_ai_name("AI_Alpha_2", 11)
+    with pytest.raises(ValueError):
+        World(num_ais=3, verbose=False, seed=1, player_name="AI_Alpha")
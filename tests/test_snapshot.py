@@ -0,0 +1,69 @@
+import pytest
+
+from engine import snapshot
+from engine.world import World
+from entities.factory import COUNTRY_CONFIG
+
+
+def played(**config):
+    world = World(verbose=False, **config)
+    world.buy_factory("China")
+    world.modify_lines("China", "A", 5)
+    world.update_sales("A", "country", "USA")
+    world.update_sales("A", "price", world.get_turn_data()["products_meta"]["A"]["price_options"][0])
+    while not world.is_game_over():
+        world.resolve_turn()
+    return world
+
+
+@pytest.mark.parametrize("backend", ["python", "numpy"])
+def test_round_trip_keeps_history(backend):
+    world = played(total_turns=12, num_ais=4, seed=8, backend=backend)
+    data = snapshot.dump(world)
+    restored = snapshot.load(data)
+
+    assert restored.turn == world.turn
+    assert restored.sales_ledger.__getstate__() == world.sales_ledger.__getstate__()
+    assert restored.kpi_series.__getstate__() == world.kpi_series.__getstate__()
+    assert [(c.name, c.cash, c.stock, c.line_totals.lines) for c in restored.companies] == \
+        [(c.name, c.cash, c.stock, c.line_totals.lines) for c in world.companies]
+    assert [(c.version, c.full_version, c.field_versions) for c in restored.companies] == \
+        [(c.version, c.full_version, c.field_versions) for c in world.companies]
+    assert snapshot.dump(restored) == data
+
+
+def test_fractional_money_round_trips(monkeypatch):
+    monkeypatch.setitem(COUNTRY_CONFIG["China"], "maintenance_cost", 100.3)
+    world = played(total_turns=4, num_ais=5, seed=7)
+    assert any(r.maintenance_cost % 1 for c in world.companies for r in world.kpi_series.records(c.name))
+    restored = snapshot.load(snapshot.dump(world))
+    assert restored.kpi_series.__getstate__() == world.kpi_series.__getstate__()
+    assert [c.cash for c in restored.companies] == [c.cash for c in world.companies]
+
+
+def test_long_game_stays_small():
+    world = World(total_turns=50, num_ais=10, verbose=False, seed=1)
+    while not world.is_game_over():
+        world.resolve_turn()
+    assert len(snapshot.dump(world)) < 12 * 1024
+
+
+def test_restored_game_plays_on_like_the_original():
+    world = World(total_turns=8, num_ais=3, verbose=False, seed=2, checkpoints=True)
+    for _ in range(4):
+        world.resolve_turn()
+    restored = snapshot.load(world.checkpoints[world.turn])
+    for game in (world, restored):
+        while not game.is_game_over():
+            game.resolve_turn()
+    assert snapshot.dump(restored) == snapshot.dump(world)
+
+
+def test_other_format_versions_are_rejected():
+    data = snapshot.dump(World(total_turns=3, num_ais=1, verbose=False, seed=1))
+    header = len(snapshot.MAGIC)
+    for version in (0, snapshot.VERSION + 1):
+        with pytest.raises(ValueError):
+            snapshot.load(data[:header] + bytes([version]) + data[header + 1:])
+    with pytest.raises(ValueError):
+        snapshot.load(b"XYZ" + data[header:])
@@ -0,0 +1,36 @@
+import pytest
+
+from engine import world as world_module
+from engine.sweep import apply_point, check_path, parse_values
+from entities.factory import COUNTRY_CONFIG
+
+
+@pytest.mark.parametrize("path", [
+    "setup_costs.USA", "country.China.maintenance_cost", "product.A.base_price", "demand.C.France",
+])
+def test_known_paths(path):
+    check_path(path)
+
+
+@pytest.mark.parametrize("path", [
+    "setup_costs.Mars", "country.China.colour", "product.Z.base_price", "demand.Z.USA", "demand.A.Mars",
+    "integration_bonus.USA",
+])
+def test_unknown_paths(path):
+    with pytest.raises(ValueError):
+        check_path(path)
+
+
+def test_parse_values():
+    assert parse_values("30000:50000:5") == [30000, 35000, 40000, 45000, 50000]
+    assert parse_values("100.5,120") == [100.5, 120]
+
+
+def test_apply_point_restores_defaults():
+    default = COUNTRY_CONFIG["China"]["maintenance_cost"]
+    apply_point({"country.China.maintenance_cost": 100.5, "setup_costs.USA": 1})
+    assert COUNTRY_CONFIG["China"]["maintenance_cost"] == 100.5
+    assert world_module.SETUP_COSTS["USA"] == 1
+    apply_point({})
+    assert COUNTRY_CONFIG["China"]["maintenance_cost"] == default
+    assert world_module.SETUP_COSTS["USA"] != 1
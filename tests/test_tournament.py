@@ -0,0 +1,22 @@
+import pytest
+
+from engine import tournament
+
+
+def summary(stats):
+    return {p: (s.seats, s.wins, s.sample) for p, s in stats.items()}
+
+
+def test_results_do_not_depend_on_workers():
+    config = dict(max_games=12, total_turns=3, num_ais=4, base_seed=3, min_games=100, batch=6)
+    played, serial = tournament.run_tournament(workers=1, **config)
+    assert played == 12
+    _, parallel = tournament.run_tournament(workers=2, **config)
+    assert summary(parallel) == summary(serial)
+
+
+def test_games_need_an_ai():
+    with pytest.raises(ValueError):
+        tournament.run_tournament(max_games=1, num_ais=0, workers=1)
+    with pytest.raises(SystemExit):
+        tournament.main(["--ais", "0", "--max-games", "1", "--workers", "1"])